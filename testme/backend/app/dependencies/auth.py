@@ -1,11 +1,14 @@
 """
 Authentication dependencies for FastAPI
 """
+import asyncio
 from typing import Dict, Any
 from fastapi import Request, HTTPException, status
 from firebase_admin import auth, firestore
 import logging
 
+from app.dependencies.firebase import wait_for_firebase
+
 logger = logging.getLogger(__name__)
 
 
@@ -73,6 +76,10 @@ async def get_current_user(request: Request) -> Dict[str, Any]:
     Raises:
         HTTPException: If authentication fails
     """
+    await wait_for_firebase(request)
+    
+    # Token verification (public key fetch) and the default-subject check are
+    # blocking Firebase calls; they run in worker threads
     # Check if user is authenticated via admin session (if SessionMiddleware is installed)
     try:
         if hasattr(request.state, '_session'):  # Check if session is available
@@ -83,11 +90,11 @@ async def get_current_user(request: Request) -> Dict[str, Any]:
                 
                 # Verify the session token is still valid
                 try:
-                    decoded_token = auth.verify_id_token(id_token)
+                    decoded_token = await asyncio.to_thread(auth.verify_id_token, id_token)
                     user_uid = decoded_token['uid']
                     
                     # Ensure user has a default subject
-                    ensure_default_subject(user_uid)
+                    await asyncio.to_thread(ensure_default_subject, user_uid)
                     
                     return {
                         'uid': user_uid,
@@ -121,12 +128,12 @@ async def get_current_user(request: Request) -> Dict[str, Any]:
     
     try:
         # Verify token with Firebase
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = await asyncio.to_thread(auth.verify_id_token, id_token)
         
         user_uid = decoded_token['uid']
         
         # Ensure user has a default subject
-        ensure_default_subject(user_uid)
+        await asyncio.to_thread(ensure_default_subject, user_uid)
         
         # Return user info
         return {
@@ -0,0 +1,56 @@
+"""
+Firebase client dependencies for FastAPI
+"""
+import asyncio
+from functools import lru_cache
+from fastapi import Request
+from firebase_admin import firestore
+
+from app.services.firebase_storage import FirebaseStorageService
+
+
+@lru_cache(maxsize=1)
+def get_firestore_client() -> firestore.Client:
+    """
+    Get the process-wide Firestore client
+
+    Created on first use (after Firebase Admin SDK initialization) and
+    reused by every request afterwards.
+    """
+    return firestore.client()
+
+
+@lru_cache(maxsize=1)
+def get_firebase_storage_service() -> FirebaseStorageService:
+    """
+    Get the process-wide Firebase Storage service
+    """
+    return FirebaseStorageService()
+
+
+async def wait_for_firebase(request: Request) -> None:
+    """
+    Wait until the lifespan's background Firebase initialization is done
+    
+    No-op when the app was started without its lifespan (e.g. tests).
+    """
+    init_task = getattr(request.app.state, 'firebase_ready', None)
+    if isinstance(init_task, asyncio.Future) and not init_task.done():
+        # Shielded: a cancelled request must not cancel the shared init
+        await asyncio.shield(init_task)
+
+
+async def get_db(request: Request) -> firestore.Client:
+    """
+    FastAPI dependency to inject the shared Firestore client
+    """
+    await wait_for_firebase(request)
+    return get_firestore_client()
+
+
+async def get_storage_service(request: Request) -> FirebaseStorageService:
+    """
+    FastAPI dependency to inject the shared Firebase Storage service
+    """
+    await wait_for_firebase(request)
+    return get_firebase_storage_service()
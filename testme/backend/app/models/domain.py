@@ -3,7 +3,7 @@ Domain models for business entities
 """
 from datetime import datetime
 from typing import List, Optional, Any, Dict
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class User(BaseModel):
@@ -13,8 +13,7 @@ class User(BaseModel):
     display_name: Optional[str] = None
     photo_url: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Subject(BaseModel):
@@ -29,8 +28,7 @@ class Subject(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PDF(BaseModel):
@@ -45,8 +43,7 @@ class PDF(BaseModel):
     uploaded_at: datetime
     status: str = "uploaded"
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Question(BaseModel):
@@ -57,8 +54,7 @@ class Question(BaseModel):
     options: Optional[List[str]] = None
     points: int
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Exam(BaseModel):
@@ -76,8 +72,7 @@ class Exam(BaseModel):
     status: str = "active"
     ai_provider: Optional[str] = "gpt"  # Which AI service was used
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class QuestionResult(BaseModel):
@@ -88,8 +83,7 @@ class QuestionResult(BaseModel):
     feedback: str
     is_correct: Optional[bool] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class GradingResult(BaseModel):
@@ -100,6 +94,5 @@ class GradingResult(BaseModel):
     question_results: List[QuestionResult]
     ai_provider: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
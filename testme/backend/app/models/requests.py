@@ -1,8 +1,19 @@
 """
 Request models for API endpoints
 """
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field, validator
+from typing import Annotated, Optional, List, Dict, Any, Literal
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, field_validator
+
+
+Difficulty = Literal['easy', 'medium', 'hard']
+AIProvider = Literal['gpt', 'gemini']
+# '#RRGGBB'; the pattern is compiled once and matched inside pydantic-core
+HexColor = Annotated[str, StringConstraints(pattern=r'^#[0-9A-Fa-f]{6}$')]
+
+
+def _lowercase(v: Any) -> Any:
+    """Normalize enum-like string input so Literal matching is case-insensitive"""
+    return v.lower() if isinstance(v, str) else v
 
 
 class SubjectCreateRequest(BaseModel):
@@ -11,10 +22,11 @@ class SubjectCreateRequest(BaseModel):
     description: Optional[str] = Field(default=None, description="Subject description", max_length=500)
     semester: Optional[str] = Field(default=None, description="Semester (e.g., '2025-1')", max_length=20)
     year: Optional[int] = Field(default=None, description="Year", ge=2000, le=2100)
-    color: Optional[str] = Field(default=None, description="Color hex code (e.g., '#FF5733')", pattern=r'^#[0-9A-Fa-f]{6}$')
+    color: Optional[HexColor] = Field(default=None, description="Color hex code (e.g., '#FF5733')")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "name": "데이터베이스",
                 "description": "데이터베이스 설계 및 구현",
@@ -23,6 +35,7 @@ class SubjectCreateRequest(BaseModel):
                 "color": "#FF5733"
             }
         }
+    )
 
 
 class SubjectUpdateRequest(BaseModel):
@@ -31,42 +44,31 @@ class SubjectUpdateRequest(BaseModel):
     description: Optional[str] = Field(default=None, description="Subject description", max_length=500)
     semester: Optional[str] = Field(default=None, description="Semester", max_length=20)
     year: Optional[int] = Field(default=None, description="Year", ge=2000, le=2100)
-    color: Optional[str] = Field(default=None, description="Color hex code", pattern=r'^#[0-9A-Fa-f]{6}$')
+    color: Optional[HexColor] = Field(default=None, description="Color hex code")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "name": "데이터베이스 시스템",
                 "description": "업데이트된 설명"
             }
         }
+    )
 
 
 class ExamGenerationRequest(BaseModel):
     """Request model for exam generation"""
     pdf_id: str = Field(..., description="UUID of the uploaded PDF")
     num_questions: int = Field(default=10, ge=1, le=50, description="Number of questions to generate")
-    difficulty: str = Field(default="medium", description="Difficulty level: easy, medium, hard")
-    ai_provider: Optional[str] = Field(default=None, description="AI provider to use: gpt or gemini")
-    
-    @validator('difficulty')
-    def validate_difficulty(cls, v):
-        allowed = ['easy', 'medium', 'hard']
-        if v.lower() not in allowed:
-            raise ValueError(f'Difficulty must be one of {allowed}')
-        return v.lower()
+    difficulty: Difficulty = Field(default="medium", description="Difficulty level: easy, medium, hard")
+    ai_provider: Optional[AIProvider] = Field(default=None, description="AI provider to use: gpt or gemini")
     
-    @validator('ai_provider')
-    def validate_ai_provider(cls, v):
-        if v is None:
-            return v
-        allowed = ['gpt', 'gemini']
-        if v.lower() not in allowed:
-            raise ValueError(f'AI provider must be one of {allowed}')
-        return v.lower()
+    _normalize_case = field_validator('difficulty', 'ai_provider', mode='before')(_lowercase)
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "pdf_id": "123e4567-e89b-12d3-a456-426614174000",
                 "num_questions": 10,
@@ -74,6 +76,7 @@ class ExamGenerationRequest(BaseModel):
                 "ai_provider": "gpt"
             }
         }
+    )
 
 
 class AnswerSubmission(BaseModel):
@@ -81,32 +84,28 @@ class AnswerSubmission(BaseModel):
     question_id: int
     answer: str
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "question_id": 1,
                 "answer": "The answer is 42"
             }
         }
+    )
 
 
 class ExamSubmissionRequest(BaseModel):
     """Request model for exam submission and grading"""
     exam_id: str = Field(..., description="Exam ID")
     answers: List[AnswerSubmission] = Field(..., description="List of student answers")
-    ai_provider: Optional[str] = Field(default=None, description="AI provider to use for grading")
+    ai_provider: Optional[AIProvider] = Field(default=None, description="AI provider to use for grading")
     
-    @validator('ai_provider')
-    def validate_ai_provider(cls, v):
-        if v is None:
-            return v
-        allowed = ['gpt', 'gemini']
-        if v.lower() not in allowed:
-            raise ValueError(f'AI provider must be one of {allowed}')
-        return v.lower()
+    _normalize_case = field_validator('ai_provider', mode='before')(_lowercase)
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "exam_id": "exam_123",
                 "answers": [
@@ -116,4 +115,5 @@ class ExamSubmissionRequest(BaseModel):
                 "ai_provider": "gpt"
             }
         }
+    )
 
@@ -3,7 +3,7 @@ Response models for API endpoints
 """
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.models.domain import Question, QuestionResult, Subject
 
@@ -13,13 +13,14 @@ class SuccessResponse(BaseModel):
     success: bool = True
     message: str
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "message": "Operation completed successfully"
             }
         }
+    )
 
 
 class SubjectResponse(BaseModel):
@@ -27,8 +28,8 @@ class SubjectResponse(BaseModel):
     success: bool = True
     subject: Subject
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "subject": {
@@ -44,6 +45,7 @@ class SubjectResponse(BaseModel):
                 }
             }
         }
+    )
 
 
 class SubjectListResponse(BaseModel):
@@ -52,8 +54,8 @@ class SubjectListResponse(BaseModel):
     subjects: List[Subject]
     count: int
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "subjects": [
@@ -72,6 +74,7 @@ class SubjectListResponse(BaseModel):
                 "count": 1
             }
         }
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -79,13 +82,14 @@ class ErrorResponse(BaseModel):
     error: str
     details: Optional[str] = None
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "error": "Invalid request",
                 "details": "PDF ID not found"
             }
         }
+    )
 
 
 class PDFUploadResponse(BaseModel):
@@ -97,8 +101,8 @@ class PDFUploadResponse(BaseModel):
     uploaded_at: datetime
     size: int
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "file_id": "123e4567-e89b-12d3-a456-426614174000",
@@ -108,6 +112,7 @@ class PDFUploadResponse(BaseModel):
                 "size": 1024000
             }
         }
+    )
 
 
 class PDFInfo(BaseModel):
@@ -116,8 +121,8 @@ class PDFInfo(BaseModel):
     original_filename: str
     file_url: str
     size: int
-    uploaded_at: datetime
-    status: str
+    uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+    status: str = "uploaded"
 
 
 class PDFListResponse(BaseModel):
@@ -126,8 +131,8 @@ class PDFListResponse(BaseModel):
     pdfs: List[PDFInfo]
     count: int
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "pdfs": [
@@ -143,6 +148,7 @@ class PDFListResponse(BaseModel):
                 "count": 1
             }
         }
+    )
 
 
 class ExamResponse(BaseModel):
@@ -155,8 +161,8 @@ class ExamResponse(BaseModel):
     created_at: datetime
     ai_provider: Optional[str] = "gpt"
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "exam_id": "exam_123",
@@ -175,18 +181,19 @@ class ExamResponse(BaseModel):
                 "ai_provider": "gpt"
             }
         }
+    )
 
 
 class ExamInfo(BaseModel):
     """Exam information for list responses"""
     exam_id: str
-    pdf_id: Optional[str]
-    num_questions: int
-    total_points: int
-    difficulty: str
-    created_at: datetime
-    status: str
-    ai_provider: Optional[str]
+    pdf_id: Optional[str] = None
+    num_questions: int = 0
+    total_points: int = 0
+    difficulty: str = "medium"
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    status: str = "active"
+    ai_provider: Optional[str] = None
 
 
 class ExamListResponse(BaseModel):
@@ -195,8 +202,8 @@ class ExamListResponse(BaseModel):
     exams: List[ExamInfo]
     count: int
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "exams": [
@@ -214,6 +221,7 @@ class ExamListResponse(BaseModel):
                 "count": 1
             }
         }
+    )
 
 
 class GradingResponse(BaseModel):
@@ -225,8 +233,8 @@ class GradingResponse(BaseModel):
     question_results: List[QuestionResult]
     ai_provider: Optional[str] = None
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "total_score": 85.5,
@@ -244,4 +252,5 @@ class GradingResponse(BaseModel):
                 "ai_provider": "gpt"
             }
         }
+    )
 
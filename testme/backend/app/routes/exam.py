@@ -1,12 +1,17 @@
 """
 Exam routes (exam generation and management) - Subject-based structure
 """
+import asyncio
 from datetime import datetime
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from typing import Dict, Any, List
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Path
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, Response
 from firebase_admin import firestore
+from pydantic import TypeAdapter, ValidationError
 
 from app.dependencies.auth import get_current_user
+from app.dependencies.firebase import get_db, get_storage_service
 from app.dependencies.ai_service import get_ai_service_dependency
 from app.services.ai_service_interface import AIServiceInterface
 from app.services.firebase_storage import FirebaseStorageService
@@ -16,13 +21,48 @@ from app.models.domain import Exam
 
 router = APIRouter(tags=["exam"])
 
+# Built once at import; validates a whole listing in a single pydantic-core call
+_EXAM_LIST_ADAPTER = TypeAdapter(List[ExamInfo])
+# Listings only need the summary fields, not the heavy questions array
+_EXAM_LIST_FIELDS = list(ExamInfo.model_fields)
+# Parses and validates the raw request body in one pydantic-core pass
+_GEN_ADAPTER = TypeAdapter(ExamGenerationRequest)
 
-@router.post("/subjects/{subject_id}/exams/generate", response_model=ExamResponse, status_code=status.HTTP_201_CREATED)
+
+async def _parse_generation_request(http_request: Request) -> ExamGenerationRequest:
+    """
+    Validate the exam generation body straight from JSON bytes
+    
+    Raises:
+        RequestValidationError: If the body is not a valid ExamGenerationRequest
+    """
+    try:
+        return _GEN_ADAPTER.validate_json(await http_request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, 'loc': ('body', *error['loc'])} for error in e.errors(include_url=False)]
+        )
+
+
+@router.post(
+    "/subjects/{subject_id}/exams/generate",
+    response_model=None,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_201_CREATED: {"model": ExamResponse}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": ExamGenerationRequest.model_json_schema()}}
+        }
+    }
+)
 async def generate_exam(
     subject_id: str = Path(..., description="Subject ID"),
-    request: ExamGenerationRequest = ...,
     user: Dict[str, Any] = Depends(get_current_user),
-    ai_service: AIServiceInterface = Depends(get_ai_service_dependency)
+    request: ExamGenerationRequest = Depends(_parse_generation_request),
+    ai_service: AIServiceInterface = Depends(get_ai_service_dependency),
+    db: firestore.Client = Depends(get_db),
+    storage_service: FirebaseStorageService = Depends(get_storage_service)
 ):
     """
     Generate exam from PDF under a specific subject
@@ -38,108 +78,108 @@ async def generate_exam(
     Returns:
         ExamResponse with generated questions
     """
-    try:
-        user_uid = user['uid']
-        pdf_id = request.pdf_id
-        num_questions = request.num_questions
-        difficulty = request.difficulty
-        
-        # Verify subject exists
-        db = firestore.client()
-        subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        subject_doc = subject_ref.get()
-        
-        if not subject_doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Subject not found'
-            )
-        
-        # Get PDF metadata from Firestore
-        pdf_ref = subject_ref.collection('pdfs').document(pdf_id)
-        pdf_doc = pdf_ref.get()
-        
-        if not pdf_doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='PDF not found'
-            )
-        
-        pdf_data = pdf_doc.to_dict()
-        
-        # Verify ownership
-        if pdf_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='Unauthorized'
-            )
-        
-        # Download PDF from Firebase Storage
-        storage_service = FirebaseStorageService()
-        pdf_bytes = storage_service.download_file(pdf_data['storage_path'])
-        
-        # Generate exam using AI service
-        generation_result = ai_service.generate_exam_from_pdf(
-            pdf_bytes,
+    user_uid = user['uid']
+    pdf_id = request.pdf_id
+    num_questions = request.num_questions
+    difficulty = request.difficulty
+    
+    # Fetch subject and PDF metadata in a single round-trip
+    # (only the fields needed for generation; both live under the
+    # user's path, so existence alone proves ownership)
+    # Blocking SDK calls run in worker threads so the event loop stays free
+    subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
+    pdf_ref = subject_ref.collection('pdfs').document(pdf_id)
+    docs = await asyncio.to_thread(
+        list,
+        db.get_all(
+            [subject_ref, pdf_ref],
+            field_paths=['storage_path', 'original_filename']
+        )
+    )
+    snapshots = {doc.reference.path: doc for doc in docs}
+    subject_doc = snapshots[subject_ref.path]
+    pdf_doc = snapshots[pdf_ref.path]
+    
+    # Verify subject exists
+    if not subject_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Subject not found'
+        )
+    
+    if not pdf_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='PDF not found'
+        )
+    
+    pdf_data = pdf_doc.to_dict()
+    
+    # Download PDF from Firebase Storage (spills to disk when large)
+    pdf_file = await asyncio.to_thread(storage_service.open_file, pdf_data['storage_path'])
+    
+    # Generate exam using AI service; the PDF is released before the Firestore write
+    with pdf_file:
+        generation_result = await asyncio.to_thread(
+            ai_service.generate_exam_from_pdf,
+            pdf_file,
             pdf_data['original_filename'],
             num_questions=num_questions,
             difficulty=difficulty
         )
-        
-        if not generation_result['success']:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to generate exam: {generation_result.get('error', 'Unknown error')}"
-            )
-        
-        exam_data = generation_result['exam']
-        
-        # Save exam to Firestore under subject
-        exams_ref = subject_ref.collection('exams')
-        exam_ref = exams_ref.document()
-        exam_id = exam_ref.id
-        
-        exam_record = {
+    
+    if not generation_result['success']:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate exam: {generation_result.get('error', 'Unknown error')}"
+        )
+    
+    exam_data = generation_result['exam']
+    
+    # Save exam to Firestore under subject
+    exams_ref = subject_ref.collection('exams')
+    exam_ref = exams_ref.document()
+    exam_id = exam_ref.id
+    
+    exam_record = {
+        'exam_id': exam_id,
+        'subject_id': subject_id,
+        'pdf_id': pdf_id,
+        'user_id': user_uid,
+        'questions': exam_data['questions'],
+        'total_points': exam_data['total_points'],
+        'estimated_time': exam_data['estimated_time'],
+        'num_questions': num_questions,
+        'difficulty': difficulty,
+        'created_at': firestore.SERVER_TIMESTAMP,
+        'status': 'active',
+        'ai_provider': ai_service.provider_name
+    }
+    
+    await asyncio.to_thread(exam_ref.set, exam_record)
+    
+    # Built as a plain dict and encoded by orjson; ExamResponse only
+    # documents the shape
+    return ORJSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content={
+            'success': True,
             'exam_id': exam_id,
-            'subject_id': subject_id,
-            'pdf_id': pdf_id,
-            'user_id': user_uid,
             'questions': exam_data['questions'],
             'total_points': exam_data['total_points'],
             'estimated_time': exam_data['estimated_time'],
-            'num_questions': num_questions,
-            'difficulty': difficulty,
-            'created_at': firestore.SERVER_TIMESTAMP,
-            'status': 'active',
+            'created_at': datetime.utcnow(),
             'ai_provider': ai_service.provider_name
         }
-        
-        exam_ref.set(exam_record)
-        
-        return ExamResponse(
-            success=True,
-            exam_id=exam_id,
-            questions=exam_data['questions'],
-            total_points=exam_data['total_points'],
-            estimated_time=exam_data['estimated_time'],
-            created_at=datetime.utcnow(),
-            ai_provider=ai_service.provider_name
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f'Exam generation failed: {str(e)}'
-        )
+    )
 
 
 @router.get("/subjects/{subject_id}/exams/{exam_id}", response_model=Dict[str, Any])
 async def get_exam(
     subject_id: str = Path(..., description="Subject ID"),
     exam_id: str = Path(..., description="Exam ID"),
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
 ):
     """
     Get exam details
@@ -152,48 +192,32 @@ async def get_exam(
     Returns:
         Exam details
     """
-    try:
-        user_uid = user['uid']
-        
-        # Get exam from Firestore
-        db = firestore.client()
-        subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        exam_ref = subject_ref.collection('exams').document(exam_id)
-        exam_doc = exam_ref.get()
-        
-        if not exam_doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Exam not found'
-            )
-        
-        exam_data = exam_doc.to_dict()
-        
-        # Verify ownership
-        if exam_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='Unauthorized'
-            )
-        
-        return {
-            'success': True,
-            'exam': exam_data
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
+    user_uid = user['uid']
+    
+    # Get exam from Firestore (the user-scoped path enforces ownership)
+    subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
+    exam_ref = subject_ref.collection('exams').document(exam_id)
+    exam_doc = await asyncio.to_thread(exam_ref.get)
+    
+    if not exam_doc.exists:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f'Failed to get exam: {str(e)}'
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Exam not found'
         )
+    
+    exam_data = exam_doc.to_dict()
+    
+    return {
+        'success': True,
+        'exam': exam_data
+    }
 
 
 @router.get("/subjects/{subject_id}/exams", response_model=ExamListResponse)
 async def list_exams(
     subject_id: str = Path(..., description="Subject ID"),
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
 ):
     """
     List all exams for a specific subject
@@ -205,48 +229,31 @@ async def list_exams(
     Returns:
         ExamListResponse with list of exams
     """
-    try:
-        user_uid = user['uid']
-        
-        # Verify subject exists
-        db = firestore.client()
-        subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        subject_doc = subject_ref.get()
-        
+    user_uid = user['uid']
+    
+    subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
+    
+    # Get all exams for subject
+    exams_ref = subject_ref.collection('exams')
+    exams = await asyncio.to_thread(
+        list,
+        exams_ref.select(_EXAM_LIST_FIELDS).order_by('created_at', direction=firestore.Query.DESCENDING).stream()
+    )
+    
+    # ExamInfo supplies defaults for missing fields and ignores the rest
+    exam_list = _EXAM_LIST_ADAPTER.validate_python([exam.to_dict() for exam in exams])
+    
+    # An empty listing may mean the subject itself is missing; only then
+    # pay for an existence check so non-empty listings stay one round-trip
+    if not exam_list:
+        subject_doc = await asyncio.to_thread(subject_ref.get, field_paths=[])
         if not subject_doc.exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='Subject not found'
             )
-        
-        # Get all exams for subject
-        exams_ref = subject_ref.collection('exams')
-        exams = exams_ref.order_by('created_at', direction=firestore.Query.DESCENDING).stream()
-        
-        exam_list = []
-        for exam in exams:
-            exam_data = exam.to_dict()
-            exam_list.append(ExamInfo(
-                exam_id=exam_data['exam_id'],
-                pdf_id=exam_data.get('pdf_id'),
-                num_questions=exam_data.get('num_questions', 0),
-                total_points=exam_data.get('total_points', 0),
-                difficulty=exam_data.get('difficulty', 'medium'),
-                created_at=exam_data.get('created_at', datetime.utcnow()),
-                status=exam_data.get('status', 'active'),
-                ai_provider=exam_data.get('ai_provider')
-            ))
-        
-        return ExamListResponse(
-            success=True,
-            exams=exam_list,
-            count=len(exam_list)
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f'Failed to list exams: {str(e)}'
-        )
+    
+    # Rows were validated above; serialize directly so FastAPI does not
+    # re-validate the listing against response_model
+    payload = ExamListResponse.model_construct(success=True, exams=exam_list, count=len(exam_list))
+    return Response(content=payload.model_dump_json(), media_type='application/json')
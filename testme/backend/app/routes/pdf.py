@@ -1,13 +1,17 @@
 """
 PDF routes (file upload and management) - Subject-based structure
 """
+import asyncio
+import os
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List
 from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, status, Path
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response
 from firebase_admin import firestore
+from pydantic import TypeAdapter
 
 from app.dependencies.auth import get_current_user
+from app.dependencies.firebase import get_db, get_storage_service
 from app.services.firebase_storage import FirebaseStorageService
 from app.utils.file_utils import allowed_file
 from app.models.responses import PDFUploadResponse, PDFListResponse, PDFInfo, SuccessResponse
@@ -15,12 +19,22 @@ from config import settings
 
 router = APIRouter(tags=["pdf"])
 
+# Built once at import; validates a whole listing in a single pydantic-core call
+_PDF_LIST_ADAPTER = TypeAdapter(List[PDFInfo])
 
-@router.post("/subjects/{subject_id}/pdfs/upload", response_model=PDFUploadResponse, status_code=status.HTTP_201_CREATED)
+
+@router.post(
+    "/subjects/{subject_id}/pdfs/upload",
+    response_model=None,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_201_CREATED: {"model": PDFUploadResponse}}
+)
 async def upload_pdf(
     subject_id: str = Path(..., description="Subject ID"),
     file: UploadFile = File(..., description="PDF file to upload"),
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db),
+    storage_service: FirebaseStorageService = Depends(get_storage_service)
 ):
     """
     Upload PDF file to Firebase Storage under a specific subject
@@ -32,108 +46,98 @@ async def upload_pdf(
     Returns:
         PDFUploadResponse with file information
     """
-    try:
-        user_uid = user['uid']
-        
-        # Verify subject exists and belongs to user
-        db = firestore.client()
-        subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        subject_doc = subject_ref.get()
-        
-        if not subject_doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Subject not found"
-            )
-        
-        subject_data = subject_doc.to_dict()
-        if subject_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Unauthorized"
-            )
-        
-        # Validate file type
-        if not file.filename:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No file selected"
-            )
-        
-        if not allowed_file(file.filename, settings.allowed_extensions):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only PDF files are allowed"
-            )
-        
-        # Check file size
-        file_content = await file.read()
-        file_length = len(file_content)
-        
-        if file_length > settings.max_file_size:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large. Maximum size: {settings.max_file_size} bytes"
-            )
-        
-        # Reset file pointer
-        await file.seek(0)
-        
-        # Upload to Firebase Storage
-        storage_service = FirebaseStorageService()
-        upload_result = storage_service.upload_file(
-            file.file,
-            user_uid,
-            file.filename
+    user_uid = user['uid']
+    
+    # Verify subject exists; it lives under the user's own path, so
+    # existence alone proves ownership
+    subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
+    subject_doc = await asyncio.to_thread(subject_ref.get, field_paths=[])
+    
+    if not subject_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subject not found"
         )
-        
-        # Get file size from Firebase Storage
-        file_size = storage_service.get_file_size(upload_result['storage_path'])
-        
-        # Save metadata to Firestore under subject
-        file_id = upload_result['file_id']
-        pdf_ref = subject_ref.collection('pdfs').document(file_id)
-        
-        pdf_data = {
-            'file_id': file_id,
-            'subject_id': subject_id,
-            'original_filename': upload_result['original_filename'],
-            'unique_filename': upload_result['unique_filename'],
-            'storage_path': upload_result['storage_path'],
-            'size': file_size,
-            'user_id': user_uid,
-            'uploaded_at': firestore.SERVER_TIMESTAMP,
-            'status': 'uploaded'
-        }
-        
-        pdf_ref.set(pdf_data)
-        
-        # Construct file URL
-        file_url = f"/api/subjects/{subject_id}/pdfs/{file_id}/download"
-        
-        return PDFUploadResponse(
-            success=True,
-            file_id=file_id,
-            original_filename=upload_result['original_filename'],
-            file_url=file_url,
-            uploaded_at=datetime.utcnow(),
-            size=file_size
+    
+    # Validate file type
+    if not file.filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No file selected"
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
+    
+    if not allowed_file(file.filename, settings.allowed_extensions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are allowed"
+        )
+    
+    # Check file size without buffering the upload in memory
+    # (the multipart parser records the size; otherwise seek to the end)
+    file_length = file.size
+    if file_length is None:
+        file.file.seek(0, os.SEEK_END)
+        file_length = file.file.tell()
+        file.file.seek(0)
+    
+    if file_length > settings.max_file_size:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Upload failed: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size: {settings.max_file_size} bytes"
         )
+    
+    # Stream the spooled upload straight to Firebase Storage
+    # (blocking SDK calls run in worker threads so the event loop stays free)
+    upload_result = await asyncio.to_thread(
+        storage_service.upload_file,
+        file.file,
+        user_uid,
+        file.filename
+    )
+    
+    # Save metadata to Firestore under subject
+    file_id = upload_result['file_id']
+    pdf_ref = subject_ref.collection('pdfs').document(file_id)
+    
+    pdf_data = {
+        'file_id': file_id,
+        'subject_id': subject_id,
+        'original_filename': upload_result['original_filename'],
+        'unique_filename': upload_result['unique_filename'],
+        'storage_path': upload_result['storage_path'],
+        'size': file_length,
+        'user_id': user_uid,
+        'uploaded_at': firestore.SERVER_TIMESTAMP,
+        'status': 'uploaded'
+    }
+    
+    await asyncio.to_thread(pdf_ref.set, pdf_data)
+    
+    # Construct file URL
+    file_url = f"/api/subjects/{subject_id}/pdfs/{file_id}/download"
+    
+    # Built as a plain dict and encoded by orjson; PDFUploadResponse only
+    # documents the shape
+    return ORJSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content={
+            'success': True,
+            'file_id': file_id,
+            'original_filename': upload_result['original_filename'],
+            'file_url': file_url,
+            'uploaded_at': datetime.utcnow(),
+            'size': file_length
+        }
+    )
 
 
 @router.get("/subjects/{subject_id}/pdfs/{file_id}/download")
 async def download_pdf(
     subject_id: str = Path(..., description="Subject ID"),
     file_id: str = Path(..., description="File ID"),
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db),
+    storage_service: FirebaseStorageService = Depends(get_storage_service)
 ):
     """
     Download PDF file from Firebase Storage
@@ -146,58 +150,43 @@ async def download_pdf(
     Returns:
         Redirect to signed URL (1-hour expiration)
     """
+    user_uid = user['uid']
+    
+    # Get file metadata from Firestore (the user-scoped path enforces ownership)
+    subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
+    pdf_ref = subject_ref.collection('pdfs').document(file_id)
+    pdf_doc = await asyncio.to_thread(pdf_ref.get, field_paths=['storage_path'])
+    
+    if not pdf_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    
+    pdf_data = pdf_doc.to_dict()
+    
+    # Generate signed URL from Firebase Storage
     try:
-        user_uid = user['uid']
-        
-        # Get file metadata from Firestore
-        db = firestore.client()
-        subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        pdf_ref = subject_ref.collection('pdfs').document(file_id)
-        pdf_doc = pdf_ref.get()
-        
-        if not pdf_doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="File not found"
-            )
-        
-        pdf_data = pdf_doc.to_dict()
-        
-        # Verify ownership
-        if pdf_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Unauthorized"
-            )
-        
-        # Generate signed URL from Firebase Storage
-        storage_service = FirebaseStorageService()
-        signed_url = storage_service.get_download_url(
+        signed_url = await asyncio.to_thread(
+            storage_service.get_download_url,
             pdf_data['storage_path'],
             expiration=timedelta(hours=1)
         )
-        
-        # Redirect to signed URL
-        return RedirectResponse(url=signed_url)
-        
-    except HTTPException:
-        raise
     except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found in storage"
         )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Download failed: {str(e)}"
-        )
+    
+    # Redirect to signed URL
+    return RedirectResponse(url=signed_url)
 
 
 @router.get("/subjects/{subject_id}/pdfs", response_model=PDFListResponse)
 async def list_pdfs(
     subject_id: str = Path(..., description="Subject ID"),
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
 ):
     """
     List all PDFs for a specific subject
@@ -208,56 +197,48 @@ async def list_pdfs(
     Returns:
         PDFListResponse with list of PDFs
     """
-    try:
-        user_uid = user['uid']
-        
-        # Verify subject exists
-        db = firestore.client()
-        subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        subject_doc = subject_ref.get()
-        
+    user_uid = user['uid']
+    
+    subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
+    
+    # Get all PDFs for subject
+    pdfs_ref = subject_ref.collection('pdfs')
+    pdfs = await asyncio.to_thread(
+        list,
+        pdfs_ref.order_by('uploaded_at', direction=firestore.Query.DESCENDING).stream()
+    )
+    
+    # PDFInfo fills in missing fields; only the URL is derived here
+    raw_pdfs = []
+    for pdf in pdfs:
+        pdf_data = pdf.to_dict()
+        pdf_data['file_url'] = f"/api/subjects/{subject_id}/pdfs/{pdf_data['file_id']}/download"
+        raw_pdfs.append(pdf_data)
+    pdf_list = _PDF_LIST_ADAPTER.validate_python(raw_pdfs)
+    
+    # An empty listing may mean the subject itself is missing; only then
+    # pay for an existence check so non-empty listings stay one round-trip
+    if not pdf_list:
+        subject_doc = await asyncio.to_thread(subject_ref.get, field_paths=[])
         if not subject_doc.exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Subject not found"
             )
-        
-        # Get all PDFs for subject
-        pdfs_ref = subject_ref.collection('pdfs')
-        pdfs = pdfs_ref.order_by('uploaded_at', direction=firestore.Query.DESCENDING).stream()
-        
-        pdf_list = []
-        for pdf in pdfs:
-            pdf_data = pdf.to_dict()
-            pdf_list.append(PDFInfo(
-                file_id=pdf_data['file_id'],
-                original_filename=pdf_data['original_filename'],
-                file_url=f"/api/subjects/{subject_id}/pdfs/{pdf_data['file_id']}/download",
-                size=pdf_data['size'],
-                uploaded_at=pdf_data.get('uploaded_at', datetime.utcnow()),
-                status=pdf_data.get('status', 'uploaded')
-            ))
-        
-        return PDFListResponse(
-            success=True,
-            pdfs=pdf_list,
-            count=len(pdf_list)
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to list PDFs: {str(e)}"
-        )
+    
+    # Rows were validated above; serialize directly so FastAPI does not
+    # re-validate the listing against response_model
+    payload = PDFListResponse.model_construct(success=True, pdfs=pdf_list, count=len(pdf_list))
+    return Response(content=payload.model_dump_json(), media_type="application/json")
 
 
 @router.delete("/subjects/{subject_id}/pdfs/{file_id}", response_model=SuccessResponse)
 async def delete_pdf(
     subject_id: str = Path(..., description="Subject ID"),
     file_id: str = Path(..., description="File ID"),
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db),
+    storage_service: FirebaseStorageService = Depends(get_storage_service)
 ):
     """
     Delete PDF file from Firebase Storage and Firestore
@@ -269,46 +250,28 @@ async def delete_pdf(
     Returns:
         SuccessResponse
     """
-    try:
-        user_uid = user['uid']
-        
-        # Get file metadata from Firestore
-        db = firestore.client()
-        subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        pdf_ref = subject_ref.collection('pdfs').document(file_id)
-        pdf_doc = pdf_ref.get()
-        
-        if not pdf_doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="File not found"
-            )
-        
-        pdf_data = pdf_doc.to_dict()
-        
-        # Verify ownership
-        if pdf_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Unauthorized"
-            )
-        
-        # Delete file from Firebase Storage
-        storage_service = FirebaseStorageService()
-        storage_service.delete_file(pdf_data['storage_path'])
-        
-        # Delete metadata from Firestore
-        pdf_ref.delete()
-        
-        return SuccessResponse(
-            success=True,
-            message="File deleted successfully"
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
+    user_uid = user['uid']
+    
+    # Get file metadata from Firestore (the user-scoped path enforces ownership)
+    subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
+    pdf_ref = subject_ref.collection('pdfs').document(file_id)
+    pdf_doc = await asyncio.to_thread(pdf_ref.get, field_paths=['storage_path'])
+    
+    if not pdf_doc.exists:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Delete failed: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
         )
+    
+    pdf_data = pdf_doc.to_dict()
+    
+    # Delete file from Firebase Storage
+    await asyncio.to_thread(storage_service.delete_file, pdf_data['storage_path'])
+    
+    # Delete metadata from Firestore
+    await asyncio.to_thread(pdf_ref.delete)
+    
+    return SuccessResponse(
+        success=True,
+        message="File deleted successfully"
+    )
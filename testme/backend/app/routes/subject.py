@@ -1,23 +1,104 @@
 """
 Subject routes (subject/course management)
 """
+import asyncio
+import hashlib
+import itertools
 from datetime import datetime
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any, Iterable, Optional, Tuple
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from firebase_admin import firestore
 
 from app.dependencies.auth import get_current_user
+from app.dependencies.firebase import get_db
 from app.models.requests import SubjectCreateRequest, SubjectUpdateRequest
 from app.models.responses import SubjectResponse, SubjectListResponse, SuccessResponse
 from app.models.domain import Subject
 
 router = APIRouter(tags=["subjects"])
 
+# Firestore caps a single WriteBatch at 500 operations
+_BATCH_LIMIT = 500
+
+# Per-process cache of each user's subject list, keyed by uid. Writes in
+# this process invalidate immediately. Writes served by another worker
+# (gunicorn runs several) are not seen here: this worker keeps serving,
+# and answering 304 for, the old list until the TTL runs out.
+_SUBJECT_LIST_CACHE_TTL = 60  # seconds
+_subject_list_cache: TTLCache = TTLCache(maxsize=10_000, ttl=_SUBJECT_LIST_CACHE_TTL)
+# Generation per uid, replaced by every invalidation, so a listing read that
+# raced a write is not stored. Bounded like the list cache; values come from
+# one process-wide counter and never repeat, so an entry that expired or was
+# evicted mid-read also reads as changed.
+_subject_list_generation: TTLCache = TTLCache(maxsize=10_000, ttl=_SUBJECT_LIST_CACHE_TTL)
+_generations = itertools.count()
+
+
+def _invalidate_subject_list(user_uid: str) -> None:
+    """Drop a user's cached subject list after a write in this process"""
+    _subject_list_cache.pop(user_uid, None)
+    _subject_list_generation[user_uid] = next(_generations)
+
+
+def _subject_etag(versions: Iterable[Tuple[str, Optional[datetime]]]) -> str:
+    """
+    Build a weak ETag from (subject_id, last-modified) pairs
+    
+    Weak because GZipMiddleware may send the same representation gzipped
+    or as-is, and a strong validator must differ between the two.
+    
+    Args:
+        versions: subject IDs with their updated_at (or created_at) timestamps
+    
+    Returns:
+        str: Weak ETag value (W/"...")
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for subject_id, modified_at in versions:
+        digest.update(f"{subject_id}@{modified_at.isoformat() if modified_at else ''};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _not_modified(http_request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match already covers etag (weak comparison)"""
+    if_none_match = http_request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in candidates or '*' in candidates
+
+
+def _purge_collection(db, collection_ref) -> None:
+    """
+    Delete every document in a collection using batched writes
+    
+    Blocking; run it in a worker thread.
+    
+    Args:
+        db: Firestore client
+        collection_ref: Collection reference to empty
+    """
+    batch = db.batch()
+    pending = 0
+    # list_documents returns bare references; no document fields come over the wire
+    for doc_ref in collection_ref.list_documents(page_size=_BATCH_LIMIT):
+        batch.delete(doc_ref)
+        pending += 1
+        if pending == _BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    
+    if pending:
+        batch.commit()
+
 
 @router.post("", response_model=SubjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_subject(
     request: SubjectCreateRequest,
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
 ):
     """
     Create a new subject
@@ -37,7 +118,6 @@ async def create_subject(
         user_uid = user['uid']
         
         # Create subject document in Firestore
-        db = firestore.client()
         subjects_ref = db.collection('users').document(user_uid).collection('subjects')
         subject_ref = subjects_ref.document()
         subject_id = subject_ref.id
@@ -54,15 +134,15 @@ async def create_subject(
             'updated_at': None
         }
         
-        subject_ref.set(subject_data)
-        
-        # Fetch the created subject to get the server timestamp
-        created_subject = subject_ref.get()
-        subject_dict = created_subject.to_dict()
+        # Blocking SDK calls run in worker threads so the event loop stays free
+        write_result = await asyncio.to_thread(subject_ref.set, subject_data)
+        # The commit time is what SERVER_TIMESTAMP resolved to; no read-back needed
+        subject_data['created_at'] = write_result.update_time
+        _invalidate_subject_list(user_uid)
         
         return SubjectResponse(
             success=True,
-            subject=Subject(**subject_dict)
+            subject=Subject(**subject_data)
         )
         
     except Exception as e:
@@ -73,7 +153,12 @@ async def create_subject(
 
 
 @router.get("", response_model=SubjectListResponse)
-async def list_subjects(user: Dict[str, Any] = Depends(get_current_user)):
+async def list_subjects(
+    http_request: Request,
+    response: Response,
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
+):
     """
     List all subjects for current user
     
@@ -85,16 +170,35 @@ async def list_subjects(user: Dict[str, Any] = Depends(get_current_user)):
     try:
         user_uid = user['uid']
         
-        # Get all subjects for user
-        db = firestore.client()
-        subjects_ref = db.collection('users').document(user_uid).collection('subjects')
-        subjects = subjects_ref.order_by('created_at', direction=firestore.Query.DESCENDING).stream()
+        cached = _subject_list_cache.get(user_uid)
+        if cached is not None:
+            subject_list, etag = cached
+        else:
+            generation = _subject_list_generation.get(user_uid)
+            if generation is None:
+                generation = _subject_list_generation[user_uid] = next(_generations)
+            # Get all subjects for user
+            subjects_ref = db.collection('users').document(user_uid).collection('subjects')
+            subjects = await asyncio.to_thread(
+                list,
+                subjects_ref.order_by('created_at', direction=firestore.Query.DESCENDING).stream()
+            )
+            
+            # Documents were validated on write; skip re-validating on read
+            subject_list = [Subject.model_construct(**subject_doc.to_dict()) for subject_doc in subjects]
+            etag = _subject_etag(
+                (subject.subject_id, subject.updated_at or subject.created_at)
+                for subject in subject_list
+            )
+            # A write during the query may have made this list stale
+            if _subject_list_generation.get(user_uid) == generation:
+                _subject_list_cache[user_uid] = (subject_list, etag)
         
-        subject_list = []
-        for subject_doc in subjects:
-            subject_data = subject_doc.to_dict()
-            subject_list.append(Subject(**subject_data))
+        # Unchanged since the client's copy: no body, no serialization
+        if _not_modified(http_request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         
+        response.headers['ETag'] = etag
         return SubjectListResponse(
             success=True,
             subjects=subject_list,
@@ -111,7 +215,10 @@ async def list_subjects(user: Dict[str, Any] = Depends(get_current_user)):
 @router.get("/{subject_id}", response_model=SubjectResponse)
 async def get_subject(
     subject_id: str,
-    user: Dict[str, Any] = Depends(get_current_user)
+    http_request: Request,
+    response: Response,
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
 ):
     """
     Get subject details
@@ -126,10 +233,9 @@ async def get_subject(
     try:
         user_uid = user['uid']
         
-        # Get subject from Firestore
-        db = firestore.client()
+        # Get subject from Firestore (the user-scoped path enforces ownership)
         subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        subject_doc = subject_ref.get()
+        subject_doc = await asyncio.to_thread(subject_ref.get)
         
         if not subject_doc.exists:
             raise HTTPException(
@@ -139,13 +245,12 @@ async def get_subject(
         
         subject_data = subject_doc.to_dict()
         
-        # Verify ownership
-        if subject_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='Unauthorized'
-            )
+        # The last-modified timestamp versions a single subject
+        etag = _subject_etag([(subject_id, subject_data.get('updated_at') or subject_data.get('created_at'))])
+        if _not_modified(http_request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         
+        response.headers['ETag'] = etag
         return SubjectResponse(
             success=True,
             subject=Subject(**subject_data)
@@ -164,7 +269,8 @@ async def get_subject(
 async def update_subject(
     subject_id: str,
     request: SubjectUpdateRequest,
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
 ):
     """
     Update subject
@@ -184,10 +290,9 @@ async def update_subject(
     try:
         user_uid = user['uid']
         
-        # Get subject from Firestore
-        db = firestore.client()
+        # Get subject from Firestore (the user-scoped path enforces ownership)
         subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        subject_doc = subject_ref.get()
+        subject_doc = await asyncio.to_thread(subject_ref.get)
         
         if not subject_doc.exists:
             raise HTTPException(
@@ -197,13 +302,6 @@ async def update_subject(
         
         subject_data = subject_doc.to_dict()
         
-        # Verify ownership
-        if subject_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='Unauthorized'
-            )
-        
         # Update only provided fields
         update_data = {}
         if request.name is not None:
@@ -219,15 +317,14 @@ async def update_subject(
         
         if update_data:
             update_data['updated_at'] = firestore.SERVER_TIMESTAMP
-            subject_ref.update(update_data)
-        
-        # Fetch updated subject
-        updated_subject = subject_ref.get()
-        subject_dict = updated_subject.to_dict()
+            write_result = await asyncio.to_thread(subject_ref.update, update_data)
+            update_data['updated_at'] = write_result.update_time
+            _invalidate_subject_list(user_uid)
         
+        # Apply the update to the copy we already read instead of re-fetching
         return SubjectResponse(
             success=True,
-            subject=Subject(**subject_dict)
+            subject=Subject(**{**subject_data, **update_data})
         )
         
     except HTTPException:
@@ -242,7 +339,8 @@ async def update_subject(
 @router.delete("/{subject_id}", response_model=SuccessResponse)
 async def delete_subject(
     subject_id: str,
-    user: Dict[str, Any] = Depends(get_current_user)
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: firestore.Client = Depends(get_db)
 ):
     """
     Delete subject
@@ -259,10 +357,10 @@ async def delete_subject(
     try:
         user_uid = user['uid']
         
-        # Get subject from Firestore
-        db = firestore.client()
+        # Existence check only; subjects live under the caller's own path,
+        # so no fields are needed to prove ownership
         subject_ref = db.collection('users').document(user_uid).collection('subjects').document(subject_id)
-        subject_doc = subject_ref.get()
+        subject_doc = await asyncio.to_thread(subject_ref.get, field_paths=[])
         
         if not subject_doc.exists:
             raise HTTPException(
@@ -270,29 +368,14 @@ async def delete_subject(
                 detail='Subject not found'
             )
         
-        subject_data = subject_doc.to_dict()
-        
-        # Verify ownership
-        if subject_data.get('user_id') != user_uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='Unauthorized'
-            )
-        
-        # Delete all pdfs under this subject
-        pdfs_ref = subject_ref.collection('pdfs')
-        pdfs = pdfs_ref.stream()
-        for pdf_doc in pdfs:
-            pdf_doc.reference.delete()
-        
-        # Delete all exams under this subject
-        exams_ref = subject_ref.collection('exams')
-        exams = exams_ref.stream()
-        for exam_doc in exams:
-            exam_doc.reference.delete()
-        
-        # Delete the subject
-        subject_ref.delete()
+        # Purge the independent pdfs and exams subcollections concurrently,
+        # then delete the subject itself
+        await asyncio.gather(
+            asyncio.to_thread(_purge_collection, db, subject_ref.collection('pdfs')),
+            asyncio.to_thread(_purge_collection, db, subject_ref.collection('exams'))
+        )
+        await asyncio.to_thread(subject_ref.delete)
+        _invalidate_subject_list(user_uid)
         
         return SuccessResponse(
             success=True,
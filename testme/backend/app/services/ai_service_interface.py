@@ -2,7 +2,7 @@
 AI Service Interface - Abstract base class for AI providers
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import BinaryIO, Dict, Any, List
 
 
 class AIServiceInterface(ABC):
@@ -14,7 +14,7 @@ class AIServiceInterface(ABC):
     @abstractmethod
     def generate_exam_from_pdf(
         self,
-        pdf_bytes: bytes,
+        pdf_file: BinaryIO,
         original_filename: str,
         num_questions: int = 10,
         difficulty: str = "medium"
@@ -23,7 +23,7 @@ class AIServiceInterface(ABC):
         Generate exam questions from PDF file
         
         Args:
-            pdf_bytes: PDF file content as bytes
+            pdf_file: Readable binary file with the PDF content
             original_filename: Original filename (for AI upload)
             num_questions: Number of questions to generate
             difficulty: Difficulty level (easy, medium, hard)
@@ -55,7 +55,7 @@ class AIServiceInterface(ABC):
     @abstractmethod
     def grade_exam_with_pdf(
         self,
-        pdf_bytes: bytes,
+        pdf_file: BinaryIO,
         original_filename: str,
         questions: List[Dict[str, Any]],
         answers: List[Dict[str, Any]]
@@ -64,7 +64,7 @@ class AIServiceInterface(ABC):
         Grade exam answers by referencing the original PDF
         
         Args:
-            pdf_bytes: Original PDF file content as bytes
+            pdf_file: Readable binary file with the original PDF content
             original_filename: Original filename
             questions: List of exam questions
             answers: List of student answers with structure:
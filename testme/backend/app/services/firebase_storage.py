@@ -1,11 +1,24 @@
 """
 Firebase Storage service for file management
 """
+import tempfile
+import threading
 import uuid
 from datetime import timedelta
+from cachetools import TTLCache
 from firebase_admin import storage
 from werkzeug.utils import secure_filename
 
+# Signed URLs are reused until shortly before they expire, so a client
+# never receives a URL that is already (or about to be) invalid
+SIGNED_URL_EXPIRATION = timedelta(hours=1)
+SIGNED_URL_CACHE_TTL = 3300  # seconds (55 minutes)
+SIGNED_URL_CACHE_SIZE = 10_000
+
+# Downloads handed to the AI services stay in memory up to this size and
+# spill to a temporary file beyond it
+DOWNLOAD_SPOOL_MAX_SIZE = 8_000_000  # bytes
+
 
 class FirebaseStorageService:
     """Service class for Firebase Storage operations"""
@@ -13,6 +26,8 @@ class FirebaseStorageService:
     def __init__(self):
         """Initialize Firebase Storage bucket"""
         self.bucket = storage.bucket()
+        self._signed_urls = TTLCache(maxsize=SIGNED_URL_CACHE_SIZE, ttl=SIGNED_URL_CACHE_TTL)
+        self._signed_urls_lock = threading.Lock()
     
     def upload_file(self, file, user_id, original_filename):
         """
@@ -59,10 +74,13 @@ class FirebaseStorageService:
             'original_filename': secure_filename(original_filename)
         }
     
-    def get_download_url(self, storage_path, expiration=timedelta(hours=1)):
+    def get_download_url(self, storage_path, expiration=SIGNED_URL_EXPIRATION):
         """
         Generate signed URL for file download
         
+        URLs with the default expiration are cached per storage path for
+        slightly less than their lifetime.
+        
         Args:
             storage_path: Path to file in Firebase Storage
             expiration: URL expiration time (default: 1 hour)
@@ -73,6 +91,13 @@ class FirebaseStorageService:
         Raises:
             Exception: If URL generation fails
         """
+        cacheable = expiration == SIGNED_URL_EXPIRATION
+        if cacheable:
+            with self._signed_urls_lock:
+                url = self._signed_urls.get(storage_path)
+            if url is not None:
+                return url
+        
         blob = self.bucket.blob(storage_path)
         
         if not blob.exists():
@@ -85,6 +110,10 @@ class FirebaseStorageService:
             method="GET"
         )
         
+        if cacheable:
+            with self._signed_urls_lock:
+                self._signed_urls[storage_path] = url
+        
         return url
     
     def delete_file(self, storage_path):
@@ -100,6 +129,9 @@ class FirebaseStorageService:
         Raises:
             Exception: If deletion fails
         """
+        with self._signed_urls_lock:
+            self._signed_urls.pop(storage_path, None)
+        
         blob = self.bucket.blob(storage_path)
         
         if blob.exists():
@@ -161,4 +193,31 @@ class FirebaseStorageService:
             raise FileNotFoundError(f"File not found: {storage_path}")
         
         return blob.download_as_bytes()
-
+    
+    def open_file(self, storage_path):
+        """
+        Download a file from Firebase Storage into a spooled temporary file
+        
+        Args:
+            storage_path: Path to file in Firebase Storage
+        
+        Returns:
+            SpooledTemporaryFile: File content, positioned at the start.
+                The caller is responsible for closing it.
+        
+        Raises:
+            FileNotFoundError: If file doesn't exist
+        """
+        blob = self.bucket.blob(storage_path)
+        
+        if not blob.exists():
+            raise FileNotFoundError(f"File not found: {storage_path}")
+        
+        spooled = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_SIZE)
+        try:
+            blob.download_to_file(spooled)
+            spooled.seek(0)
+        except Exception:
+            spooled.close()
+            raise
+        return spooled
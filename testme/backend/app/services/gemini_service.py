@@ -5,11 +5,11 @@ Uses Google Generative AI SDK
 import os
 import json
 import logging
-import io
-from typing import List, Dict, Any, Optional
+from typing import BinaryIO, List, Dict, Any, Optional
 import google.generativeai as genai
 
 from app.services.ai_service_interface import AIServiceInterface
+from app.utils.json_utils import find_json_object
 
 
 class GeminiService(AIServiceInterface):
@@ -37,7 +37,7 @@ class GeminiService(AIServiceInterface):
     
     def generate_exam_from_pdf(
         self,
-        pdf_bytes: bytes,
+        pdf_file: BinaryIO,
         original_filename: str,
         num_questions: int = 10,
         difficulty: str = "medium"
@@ -46,7 +46,7 @@ class GeminiService(AIServiceInterface):
         Generate exam questions from PDF file using Gemini
         
         Args:
-            pdf_bytes: PDF file content as bytes
+            pdf_file: Readable binary file with the PDF content
             original_filename: Original filename
             num_questions: Number of questions to generate
             difficulty: Difficulty level (easy, medium, hard)
@@ -56,7 +56,6 @@ class GeminiService(AIServiceInterface):
         """
         try:
             # Upload PDF to Gemini
-            pdf_file = io.BytesIO(pdf_bytes)
             uploaded_file = genai.upload_file(pdf_file, mime_type='application/pdf')
             
             self.logger.info(f"Uploaded PDF to Gemini: {uploaded_file.name}")
@@ -113,16 +112,9 @@ Generate the questions now:
                 exam_data = json.loads(response_text)
             except json.JSONDecodeError:
                 # Try to extract JSON from response (in case of markdown code blocks)
-                import re
-                # Remove markdown code blocks if present
-                cleaned = re.sub(r'```json\s*', '', response_text)
-                cleaned = re.sub(r'```\s*', '', cleaned)
-                cleaned = cleaned.strip()
-                
-                # Try to find JSON object
-                match = re.search(r'\{[\s\S]*\}', cleaned)
-                if match:
-                    exam_data = json.loads(match.group(0))
+                json_text = find_json_object(response_text)
+                if json_text:
+                    exam_data = json.loads(json_text)
                 else:
                     raise ValueError(f"Could not parse JSON from response: {response_text[:200]}")
             
@@ -144,7 +136,7 @@ Generate the questions now:
     
     def grade_exam_with_pdf(
         self,
-        pdf_bytes: bytes,
+        pdf_file: BinaryIO,
         original_filename: str,
         questions: List[Dict[str, Any]],
         answers: List[Dict[str, Any]]
@@ -153,7 +145,7 @@ Generate the questions now:
         Grade exam answers by referencing the original PDF using Gemini
         
         Args:
-            pdf_bytes: Original PDF file content as bytes
+            pdf_file: Readable binary file with the original PDF content
             original_filename: Original filename
             questions: List of exam questions
             answers: List of student answers
@@ -163,7 +155,6 @@ Generate the questions now:
         """
         try:
             # Upload PDF to Gemini
-            pdf_file = io.BytesIO(pdf_bytes)
             uploaded_file = genai.upload_file(pdf_file, mime_type='application/pdf')
             
             self.logger.info(f"Uploaded PDF for grading to Gemini: {uploaded_file.name}")
@@ -193,9 +184,10 @@ Here are the questions and answers to grade:
 
 """
             
+            answers_by_id = {a['question_id']: a for a in answers}
             for question in questions:
                 q_id = question['id']
-                answer = next((a for a in answers if a['question_id'] == q_id), None)
+                answer = answers_by_id.get(q_id)
                 
                 grading_text += f"\nQuestion {q_id} ({question['points']} points):\n"
                 grading_text += f"{question['question']}\n"
@@ -215,14 +207,9 @@ Here are the questions and answers to grade:
                 result_data = json.loads(response_text)
             except json.JSONDecodeError:
                 # Try to extract JSON from response
-                import re
-                cleaned = re.sub(r'```json\s*', '', response_text)
-                cleaned = re.sub(r'```\s*', '', cleaned)
-                cleaned = cleaned.strip()
-                
-                match = re.search(r'\{[\s\S]*\}', cleaned)
-                if match:
-                    result_data = json.loads(match.group(0))
+                json_text = find_json_object(response_text)
+                if json_text:
+                    result_data = json.loads(json_text)
                 else:
                     raise ValueError(f"Could not parse JSON from grading response: {response_text[:200]}")
             
@@ -288,14 +275,9 @@ Provide your grading now:
             try:
                 grade_data = json.loads(response_text)
             except json.JSONDecodeError:
-                import re
-                cleaned = re.sub(r'```json\s*', '', response_text)
-                cleaned = re.sub(r'```\s*', '', cleaned)
-                cleaned = cleaned.strip()
-                
-                match = re.search(r'\{[\s\S]*\}', cleaned)
-                if match:
-                    grade_data = json.loads(match.group(0))
+                json_text = find_json_object(response_text)
+                if json_text:
+                    grade_data = json.loads(json_text)
                 else:
                     raise ValueError(f"Could not parse JSON: {response_text[:200]}")
             
@@ -3,12 +3,124 @@ GPT Service for exam generation and grading
 Uses OpenAI API v1.x+ (new client-based structure)
 """
 import os
-import json
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO, List, Dict, Any, Optional, Set, Tuple
+import httpx
+import orjson
+from cachetools import TTLCache
 from openai import OpenAI
 
 from app.services.ai_service_interface import AIServiceInterface
+from app.utils.json_utils import find_json_object
+
+
+# Shared HTTP connection pool so keep-alive connections (and TLS sessions)
+# survive across requests instead of being rebuilt per GPTService instance
+_http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    timeout=60.0,
+)
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(api_key: str) -> OpenAI:
+    """Return the process-wide OpenAI client for an API key (pooled connections)."""
+    return OpenAI(api_key=api_key, http_client=_http_client)
+
+
+# Process-wide model knowledge. GPTService is built per request, so these
+# live at module level to survive across requests:
+# - the fallback that answered when the primary failed, with when it was
+#   adopted, keyed by the configured primary model. It is tried first for
+#   FALLBACK_MODEL_TTL only: primary failures are often transient (429s,
+#   timeouts), so the primary gets tried first again afterwards.
+# - request parameters each model has rejected ('max_tokens', 'temperature');
+#   these are stable, so they are kept for good
+FALLBACK_MODEL_TTL = 300  # seconds
+_last_good_model: Dict[str, Tuple[str, float]] = {}
+_rejected_params: Dict[str, Set[str]] = {}
+
+# Output token budget per question in a batched grading call
+_GRADING_TOKENS_PER_QUESTION = 300
+
+# Assistants are long-lived: their instructions are static and per-request
+# parameters travel as additional_instructions on the run
+_GENERATOR_INSTRUCTIONS = (
+    "You are an expert exam creator. "
+    "Analyze the provided PDF lecture material and generate exam questions. "
+    "Create a mix of multiple choice (40%), short answer (40%), and essay questions (20%). "
+    "Return ONLY valid JSON with this exact structure: "
+    '{"questions": [{"id": 1, "question": "...", "type": "multiple_choice|short_answer|essay", '
+    '"options": ["A", "B", "C", "D"], "points": 10}], "total_points": 100, "estimated_time": 60}'
+)
+_GRADER_INSTRUCTIONS = (
+    "You are an expert exam grader. "
+    "Grade student answers based on the lecture PDF content. "
+    "Be objective and provide constructive feedback. "
+    "Return ONLY valid JSON with this structure: "
+    '{"question_results": [{"question_id": 1, "score": 0-100, "feedback": "...", "is_correct": true/false}], '
+    '"total_score": 85.5, "max_score": 100, "percentage": 85.5}'
+)
+
+# Assistant ids resolved in this process, keyed by (api_key, name, model)
+_assistant_ids: Dict[Tuple[str, str, str], str] = {}
+_assistant_lock = threading.Lock()
+
+# Uploaded-file cleanup runs off the request path; nobody waits for it
+_cleanup_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="openai-cleanup")
+
+# Uploaded PDFs are kept for an hour so grading can reuse the file that
+# generation uploaded for the same PDF
+UPLOADED_FILE_CACHE_TTL = 3600
+UPLOADED_FILE_CACHE_SIZE = 256
+# OpenAI deletes uploads on its own this long after creation. It outlives
+# the cache entry by an hour, so a file id handed out just before the entry
+# expires stays valid for the run using it; nothing here deletes a file
+# another run may share, and nothing leaks when a worker exits.
+UPLOADED_FILE_EXPIRY = UPLOADED_FILE_CACHE_TTL + 3600
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _remembered_fallback(primary_model: str) -> Optional[str]:
+    """Return the fallback to try before primary_model, if one answered within FALLBACK_MODEL_TTL"""
+    entry = _last_good_model.get(primary_model)
+    if entry is None:
+        return None
+    model, adopted_at = entry
+    if time.monotonic() - adopted_at > FALLBACK_MODEL_TTL:
+        return None
+    return model
+
+
+def _remember_model(primary_model: str, model: str) -> None:
+    """Record which model answered; a fallback's TTL runs from when it was first adopted"""
+    if model == primary_model:
+        _last_good_model.pop(primary_model, None)
+    elif _remembered_fallback(primary_model) != model:
+        _last_good_model[primary_model] = (model, time.monotonic())
+
+
+def _delete_file_later(client: OpenAI, file_id: str) -> None:
+    """Delete an uploaded OpenAI file without blocking the caller; failures are only logged."""
+    def delete() -> None:
+        try:
+            client.files.delete(file_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete OpenAI file {file_id}: {e}")
+
+    _cleanup_executor.submit(delete)
+
+
+# OpenAI file ids keyed by (api_key, sha256 of the PDF)
+_uploaded_files: TTLCache = TTLCache(maxsize=UPLOADED_FILE_CACHE_SIZE, ttl=UPLOADED_FILE_CACHE_TTL)
+_uploaded_files_lock = threading.Lock()
 
 
 class GPTService(AIServiceInterface):
@@ -22,19 +134,21 @@ class GPTService(AIServiceInterface):
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found in environment")
 
-        # Initialize OpenAI client (v1.x+ structure)
-        self.client = OpenAI(api_key=self.api_key)
+        # Reuse the pooled OpenAI client (v1.x+ structure)
+        self.client = get_openai_client(self.api_key)
 
         # Model configuration with fallback chain
         env_model = model or os.getenv('OPENAI_MODEL', 'gpt-5')
-        self.model_candidates: List[str] = [
+        # dict.fromkeys drops the duplicate when env_model is already in the chain
+        self.model_candidates: List[str] = list(dict.fromkeys([
             env_model,
             'gpt-5',
             'gpt-4.1',
             'gpt-4o',
             'gpt-4o-mini',
-        ]
-        self.active_model: Optional[str] = None
+        ]))
+        self._primary_model = env_model
+        self.active_model: Optional[str] = _remembered_fallback(env_model)
         self.logger = logging.getLogger(__name__)
 
     @property
@@ -62,6 +176,7 @@ class GPTService(AIServiceInterface):
         - If model rejects max_tokens, retry with max_completion_tokens
         - If model rejects temperature, retry without temperature
         - For gpt-5, avoid response_format unless required by prompt
+        Rejections are remembered per model, so later calls skip the failed probe.
         """
         def call(kwargs: Dict[str, Any]):
             return self.client.chat.completions.create(**kwargs)
@@ -77,37 +192,35 @@ class GPTService(AIServiceInterface):
         if not is_gpt5 and response_format is not None:
             kwargs['response_format'] = response_format
 
-        # tokens & temperature handling
-        kwargs['max_tokens'] = max_tokens
-        if temperature is not None:
+        # tokens & temperature handling (skip parameters this model is known to reject)
+        rejected = _rejected_params.setdefault(model, set())
+        if 'max_tokens' in rejected:
+            kwargs['max_completion_tokens'] = max_tokens
+        else:
+            kwargs['max_tokens'] = max_tokens
+        if temperature is not None and 'temperature' not in rejected:
             kwargs['temperature'] = temperature
 
-        # Try 1: as-is
-        try:
-            return call(kwargs)
-        except Exception as e:
-            msg = str(e)
-            # Retry: if max_tokens unsupported → switch to max_completion_tokens
-            if "Unsupported parameter: 'max_tokens'" in msg:
-                self._log_warn(f"Model '{model}' rejected max_tokens; retrying with max_completion_tokens")
-                kwargs.pop('max_tokens', None)
-                kwargs['max_completion_tokens'] = max_tokens
-                try:
-                    return call(kwargs)
-                except Exception as e2:
-                    msg2 = str(e2)
-                    # If temperature unsupported → drop it and retry
-                    if "Unsupported value: 'temperature'" in msg2:
-                        self._log_warn(f"Model '{model}' rejected temperature; retrying without temperature")
-                        kwargs.pop('temperature', None)
-                        return call(kwargs)
-                    raise
-            # Retry: temperature unsupported → drop it and retry
-            if "Unsupported value: 'temperature'" in msg:
-                self._log_warn(f"Model '{model}' rejected temperature; retrying without temperature")
-                kwargs.pop('temperature', None)
+        # Each parameter can be dropped at most once, so this terminates
+        while True:
+            try:
                 return call(kwargs)
-            raise
+            except Exception as e:
+                msg = str(e)
+                # Retry: if max_tokens unsupported → switch to max_completion_tokens
+                if "Unsupported parameter: 'max_tokens'" in msg and 'max_tokens' in kwargs:
+                    self._log_warn(f"Model '{model}' rejected max_tokens; retrying with max_completion_tokens")
+                    rejected.add('max_tokens')
+                    kwargs.pop('max_tokens')
+                    kwargs['max_completion_tokens'] = max_tokens
+                    continue
+                # Retry: temperature unsupported → drop it and retry
+                if "Unsupported value: 'temperature'" in msg and 'temperature' in kwargs:
+                    self._log_warn(f"Model '{model}' rejected temperature; retrying without temperature")
+                    rejected.add('temperature')
+                    kwargs.pop('temperature')
+                    continue
+                raise
 
     # ---------- internal chat helper with fallback ----------
     def _chat_with_fallback(
@@ -118,8 +231,14 @@ class GPTService(AIServiceInterface):
         max_tokens: int = 1000,
         response_format: Optional[Dict[str, Any]] = None,
     ):
+        # Try the last known-good model first instead of re-paying the
+        # failures of the models ahead of it
+        candidates = self.model_candidates
+        if self.active_model:
+            candidates = [self.active_model] + [m for m in candidates if m != self.active_model]
+
         last_error = None
-        for model in self.model_candidates:
+        for model in candidates:
             try:
                 resp = self._create_chat_completion(
                     model=model,
@@ -129,6 +248,7 @@ class GPTService(AIServiceInterface):
                     response_format=response_format,
                 )
                 self.active_model = model  # cache success
+                _remember_model(self._primary_model, model)
                 return resp
             except Exception as e:
                 last_error = e
@@ -137,13 +257,149 @@ class GPTService(AIServiceInterface):
         # All candidates failed
         raise last_error  # type: ignore[misc]
 
+    # ---------- internal file helpers ----------
+    def _upload_pdf(self, pdf_file: BinaryIO, original_filename: str) -> str:
+        """
+        Return an OpenAI file id for the PDF, uploading it only if the same
+        content was not uploaded within UPLOADED_FILE_CACHE_TTL.
+        The file is read in chunks and streamed to OpenAI, never loaded whole.
+        """
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: pdf_file.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        pdf_file.seek(0)
+        key = (self.api_key, digest.hexdigest())
+        with _uploaded_files_lock:
+            file_id = _uploaded_files.get(key)
+        if file_id is not None:
+            self._log_warn(f"Reusing uploaded PDF on OpenAI: {file_id}")
+            return file_id
+
+        file_id = self.client.files.create(
+            file=(original_filename, pdf_file),
+            purpose='assistants',
+            expires_after={'anchor': 'created_at', 'seconds': UPLOADED_FILE_EXPIRY},
+        ).id
+        self._log_warn(f"Uploaded PDF to OpenAI: {file_id}")
+
+        with _uploaded_files_lock:
+            cached_id = _uploaded_files.get(key)
+            if cached_id is None:
+                _uploaded_files[key] = file_id
+        if cached_id is not None:
+            # A concurrent request uploaded the same PDF first; keep theirs
+            _delete_file_later(self.client, file_id)
+            return cached_id
+        return file_id
+
+    def _forget_pdf(self, file_id: str) -> None:
+        """
+        Stop reusing an uploaded PDF after a failed run (the file may be the cause).
+        The file is left to expire on OpenAI: a concurrent run may still be using it.
+        """
+        with _uploaded_files_lock:
+            stale = [key for key, cached_id in _uploaded_files.items() if cached_id == file_id]
+            for key in stale:
+                del _uploaded_files[key]
+
+    # ---------- internal assistant helper ----------
+    def _get_assistant_id(self, name: str, instructions: str) -> str:
+        """
+        Return the id of a reusable file_search assistant, resolving it once per process.
+        An assistant left by an earlier process with the same name, model and
+        instructions is adopted; otherwise one is created.
+        """
+        model = self.model_candidates[0]  # Use primary model
+        key = (self.api_key, name, model)
+        with _assistant_lock:
+            assistant_id = _assistant_ids.get(key)
+            if assistant_id is None:
+                existing = next(
+                    (
+                        a for a in self.client.beta.assistants.list(limit=100)
+                        if a.name == name and a.model == model and a.instructions == instructions
+                    ),
+                    None,
+                )
+                if existing is None:
+                    existing = self.client.beta.assistants.create(
+                        name=name,
+                        instructions=instructions,
+                        model=model,
+                        tools=[{"type": "file_search"}],
+                    )
+                assistant_id = existing.id
+                _assistant_ids[key] = assistant_id
+        return assistant_id
+
+    def _run_assistant_on_pdf(
+        self,
+        *,
+        assistant_name: str,
+        instructions: str,
+        pdf_file: BinaryIO,
+        original_filename: str,
+        user_message: str,
+        additional_instructions: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a reusable file_search assistant over a PDF and return its parsed JSON reply.
+        
+        Raises:
+            Exception: If the run does not complete or the reply holds no JSON object
+        """
+        # Upload PDF to OpenAI (reused if this PDF was uploaded recently)
+        file_id = self._upload_pdf(pdf_file, original_filename)
+        assistant_id = self._get_assistant_id(assistant_name, instructions)
+        
+        # Create thread and attach file
+        thread = self.client.beta.threads.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": user_message,
+                    "attachments": [
+                        {"file_id": file_id, "tools": [{"type": "file_search"}]}
+                    ]
+                }
+            ]
+        )
+        
+        # Run assistant (request-specific settings ride along with the run)
+        run_kwargs: Dict[str, Any] = {}
+        if additional_instructions:
+            run_kwargs['additional_instructions'] = additional_instructions
+        run = self.client.beta.threads.runs.create_and_poll(
+            thread_id=thread.id,
+            assistant_id=assistant_id,
+            **run_kwargs,
+        )
+        
+        if run.status != 'completed':
+            # Re-upload next time instead of reusing a file that may be the cause
+            self._forget_pdf(file_id)
+            raise Exception(f"Assistant run failed with status: {run.status}")
+        
+        messages = self.client.beta.threads.messages.list(thread_id=thread.id)
+        response_content = messages.data[0].content[0].text.value
+        
+        # Parse JSON from response
+        try:
+            return orjson.loads(response_content)
+        except Exception:
+            # Try to extract JSON from response
+            json_text = find_json_object(response_content)
+            if json_text:
+                return orjson.loads(json_text)
+            raise ValueError(f"Could not parse JSON from {assistant_name} response: {response_content[:200]}")
+
     # ---------- public methods ----------
-    def generate_exam_from_pdf(self, pdf_bytes: bytes, original_filename: str, num_questions: int = 10, difficulty: str = "medium") -> Dict[str, Any]:
+    def generate_exam_from_pdf(self, pdf_file: BinaryIO, original_filename: str, num_questions: int = 10, difficulty: str = "medium") -> Dict[str, Any]:
         """
         Generate exam from PDF file using OpenAI File API.
         
         Args:
-            pdf_bytes: PDF file content as bytes
+            pdf_file: Readable binary file with the PDF content
             original_filename: Original filename (for OpenAI file upload)
             num_questions: Number of questions to generate
             difficulty: Difficulty level (easy, medium, hard)
@@ -152,86 +408,22 @@ class GPTService(AIServiceInterface):
             Dict with success status and exam data
         """
         try:
-            # Upload PDF to OpenAI
-            import io
-            pdf_file = io.BytesIO(pdf_bytes)
-            pdf_file.name = original_filename
-            
-            file_response = self.client.files.create(
-                file=pdf_file,
-                purpose='assistants'
-            )
-            file_id = file_response.id
-            
-            self._log_warn(f"Uploaded PDF to OpenAI: {file_id}")
-            
-            # Create assistant for exam generation
-            assistant = self.client.beta.assistants.create(
-                name="Exam Generator",
-                instructions=(
-                    f"You are an expert exam creator. "
-                    f"Analyze the provided PDF lecture material and generate {num_questions} exam questions. "
-                    f"Difficulty level: {difficulty}. "
-                    "Create a mix of multiple choice (40%), short answer (40%), and essay questions (20%). "
-                    "Return ONLY valid JSON with this exact structure: "
-                    '{"questions": [{"id": 1, "question": "...", "type": "multiple_choice|short_answer|essay", '
-                    '"options": ["A", "B", "C", "D"], "points": 10}], "total_points": 100, "estimated_time": 60}'
+            exam_data = self._run_assistant_on_pdf(
+                assistant_name="Exam Generator",
+                instructions=_GENERATOR_INSTRUCTIONS,
+                pdf_file=pdf_file,
+                original_filename=original_filename,
+                user_message=f"Generate {num_questions} exam questions from this lecture PDF at {difficulty} difficulty level.",
+                additional_instructions=(
+                    f"Generate exactly {num_questions} exam questions. "
+                    f"Difficulty level: {difficulty}."
                 ),
-                model=self.model_candidates[0],  # Use primary model
-                tools=[{"type": "file_search"}],
             )
-            
-            # Create thread and attach file
-            thread = self.client.beta.threads.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"Generate {num_questions} exam questions from this lecture PDF at {difficulty} difficulty level.",
-                        "attachments": [
-                            {"file_id": file_id, "tools": [{"type": "file_search"}]}
-                        ]
-                    }
-                ]
-            )
-            
-            # Run assistant
-            run = self.client.beta.threads.runs.create_and_poll(
-                thread_id=thread.id,
-                assistant_id=assistant.id,
-            )
-            
-            if run.status == 'completed':
-                messages = self.client.beta.threads.messages.list(thread_id=thread.id)
-                response_content = messages.data[0].content[0].text.value
-                
-                # Parse JSON from response
-                try:
-                    exam_data = json.loads(response_content)
-                except Exception:
-                    # Try to extract JSON from response
-                    import re
-                    match = re.search(r'\{[\s\S]*\}', response_content)
-                    if match:
-                        exam_data = json.loads(match.group(0))
-                    else:
-                        raise ValueError(f"Could not parse JSON from response: {response_content[:200]}")
-                
-                # Cleanup
-                self.client.files.delete(file_id)
-                self.client.beta.assistants.delete(assistant.id)
-                
-                return {
-                    'success': True,
-                    'exam': exam_data,
-                    'model': self.model,
-                }
-            else:
-                # Cleanup on failure
-                self.client.files.delete(file_id)
-                self.client.beta.assistants.delete(assistant.id)
-                
-                raise Exception(f"Assistant run failed with status: {run.status}")
-                
+            return {
+                'success': True,
+                'exam': exam_data,
+                'model': self.model,
+            }
         except Exception as e:
             self._log_error(f'GPT exam generation failed: {e}')
             return {
@@ -239,12 +431,12 @@ class GPTService(AIServiceInterface):
                 'error': str(e),
             }
 
-    def grade_exam_with_pdf(self, pdf_bytes: bytes, original_filename: str, questions: List[Dict[str, Any]], answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def grade_exam_with_pdf(self, pdf_file: BinaryIO, original_filename: str, questions: List[Dict[str, Any]], answers: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Grade exam answers by referencing the original PDF.
         
         Args:
-            pdf_bytes: Original PDF file content as bytes
+            pdf_file: Readable binary file with the original PDF content
             original_filename: Original filename
             questions: List of exam questions
             answers: List of student answers
@@ -253,39 +445,12 @@ class GPTService(AIServiceInterface):
             Dict with success status and grading results
         """
         try:
-            # Upload PDF to OpenAI
-            import io
-            pdf_file = io.BytesIO(pdf_bytes)
-            pdf_file.name = original_filename
-            
-            file_response = self.client.files.create(
-                file=pdf_file,
-                purpose='assistants'
-            )
-            file_id = file_response.id
-            
-            self._log_warn(f"Uploaded PDF for grading to OpenAI: {file_id}")
-            
-            # Create assistant for grading
-            assistant = self.client.beta.assistants.create(
-                name="Exam Grader",
-                instructions=(
-                    "You are an expert exam grader. "
-                    "Grade student answers based on the lecture PDF content. "
-                    "Be objective and provide constructive feedback. "
-                    "Return ONLY valid JSON with this structure: "
-                    '{"question_results": [{"question_id": 1, "score": 0-100, "feedback": "...", "is_correct": true/false}], '
-                    '"total_score": 85.5, "max_score": 100, "percentage": 85.5}'
-                ),
-                model=self.model_candidates[0],
-                tools=[{"type": "file_search"}],
-            )
-            
             # Prepare grading prompt
             grading_text = "Grade the following exam answers based on the lecture PDF:\n\n"
+            answers_by_id = {a['question_id']: a for a in answers}
             for question in questions:
                 q_id = question['id']
-                answer = next((a for a in answers if a['question_id'] == q_id), None)
+                answer = answers_by_id.get(q_id)
                 
                 grading_text += f"Question {q_id} ({question['points']} points):\n"
                 grading_text += f"{question['question']}\n"
@@ -294,56 +459,17 @@ class GPTService(AIServiceInterface):
                 else:
                     grading_text += "Student's Answer: [No answer provided]\n\n"
             
-            # Create thread and attach file
-            thread = self.client.beta.threads.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": grading_text,
-                        "attachments": [
-                            {"file_id": file_id, "tools": [{"type": "file_search"}]}
-                        ]
-                    }
-                ]
-            )
-            
-            # Run assistant
-            run = self.client.beta.threads.runs.create_and_poll(
-                thread_id=thread.id,
-                assistant_id=assistant.id,
+            result_data = self._run_assistant_on_pdf(
+                assistant_name="Exam Grader",
+                instructions=_GRADER_INSTRUCTIONS,
+                pdf_file=pdf_file,
+                original_filename=original_filename,
+                user_message=grading_text,
             )
-            
-            if run.status == 'completed':
-                messages = self.client.beta.threads.messages.list(thread_id=thread.id)
-                response_content = messages.data[0].content[0].text.value
-                
-                # Parse JSON from response
-                try:
-                    result_data = json.loads(response_content)
-                except Exception:
-                    # Try to extract JSON from response
-                    import re
-                    match = re.search(r'\{[\s\S]*\}', response_content)
-                    if match:
-                        result_data = json.loads(match.group(0))
-                    else:
-                        raise ValueError(f"Could not parse JSON from grading response: {response_content[:200]}")
-                
-                # Cleanup
-                self.client.files.delete(file_id)
-                self.client.beta.assistants.delete(assistant.id)
-                
-                return {
-                    'success': True,
-                    'result': result_data,
-                }
-            else:
-                # Cleanup on failure
-                self.client.files.delete(file_id)
-                self.client.beta.assistants.delete(assistant.id)
-                
-                raise Exception(f"Assistant run failed with status: {run.status}")
-                
+            return {
+                'success': True,
+                'result': result_data,
+            }
         except Exception as e:
             self._log_error(f'Exam grading with PDF failed: {e}')
             return {
@@ -351,6 +477,36 @@ class GPTService(AIServiceInterface):
                 'error': str(e),
             }
     
+    @staticmethod
+    def _normalize_grade(raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a model's grade object to guarantee score/feedback/is_correct"""
+        def pick(*keys, default=None):
+            for k in keys:
+                if k in raw and raw[k] is not None:
+                    return raw[k]
+            return default
+
+        score = pick('score', 'grade', 'score_percent', default=0)
+        try:
+            score = float(score)
+        except Exception:
+            score = 0.0
+
+        feedback = pick('feedback', 'explanation', 'comment', default="")
+
+        is_correct = pick('is_correct', 'correct', default=None)
+        if isinstance(is_correct, str):
+            is_correct = is_correct.lower() in ('true', 'yes', '1')
+        if is_correct is None:
+            # Derive correctness if not provided
+            is_correct = bool(score >= 99)
+
+        return {
+            'score': int(round(score)),
+            'feedback': feedback,
+            'is_correct': bool(is_correct),
+        }
+
     def grade_answer(self, question: str, student_answer: str, correct_answer: Optional[str] = None) -> Dict[str, Any]:
         """
         Legacy method: Grade single answer without PDF reference.
@@ -384,35 +540,7 @@ class GPTService(AIServiceInterface):
             )
 
             result = response.choices[0].message.content or "{}"
-            raw = json.loads(result)
-
-            # Normalize fields to guarantee score/feedback/is_correct
-            def pick(*keys, default=None):
-                for k in keys:
-                    if k in raw and raw[k] is not None:
-                        return raw[k]
-                return default
-
-            score = pick('score', 'grade', 'score_percent', default=0)
-            try:
-                score = float(score)
-            except Exception:
-                score = 0.0
-
-            feedback = pick('feedback', 'explanation', 'comment', default="")
-
-            is_correct = pick('is_correct', 'correct', default=None)
-            if isinstance(is_correct, str):
-                is_correct = is_correct.lower() in ('true', 'yes', '1')
-            if is_correct is None:
-                # Derive correctness if not provided
-                is_correct = bool(score >= 99)
-
-            grade_data = {
-                'score': int(round(score)),
-                'feedback': feedback,
-                'is_correct': bool(is_correct),
-            }
+            grade_data = self._normalize_grade(orjson.loads(result))
 
             return {
                 'success': True,
@@ -426,15 +554,80 @@ class GPTService(AIServiceInterface):
                 'error': str(e),
             }
 
+    def _grade_answers_batch(
+        self,
+        questions: List[Dict[str, Any]],
+        answers_by_id: Dict[Any, Dict[str, Any]],
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Grade several answers with one chat completion.
+
+        Returns:
+            Normalized grades keyed by question id; questions the model
+            skipped (or all of them, if the call fails) are left out
+        """
+        system_prompt = (
+            "You are an expert exam grader.\n"
+            "Grade each student answer objectively and provide constructive feedback.\n\n"
+            "Provide your response as valid JSON:\n"
+            "{\n"
+            "    \"grades\": [\n"
+            "        {\"question_id\": 1, \"score\": 0-100, \"feedback\": \"detailed feedback\", \"is_correct\": true/false}\n"
+            "    ]\n"
+            "}"
+        )
+
+        user_parts = []
+        for question in questions:
+            q_id = question['id']
+            user_parts.append(
+                f"Question {q_id}: {question['question']}\n"
+                f"Student's Answer: {answers_by_id[q_id]['answer']}\n"
+            )
+        user_prompt = "\n".join(user_parts)
+
+        try:
+            response = self._chat_with_fallback(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0.3,
+                max_tokens=_GRADING_TOKENS_PER_QUESTION * len(questions),
+                response_format={"type": "json_object"},
+            )
+            raw = orjson.loads(response.choices[0].message.content or "{}")
+        except Exception as e:
+            self._log_error(f'GPT batch grading failed: {e}')
+            return {}
+
+        # Match grades back by id; the model may echo ids as strings
+        ids_by_key = {str(q['id']): q['id'] for q in questions}
+        grades: Dict[Any, Dict[str, Any]] = {}
+        for entry in raw.get('grades') or []:
+            if not isinstance(entry, dict):
+                continue
+            q_id = ids_by_key.get(str(entry.get('question_id')))
+            if q_id is not None:
+                grades[q_id] = self._normalize_grade(entry)
+        return grades
+
     def grade_exam(self, questions: List[Dict[str, Any]], answers: List[Dict[str, Any]]) -> Dict[str, Any]:
         try:
             results = []
             total_score = 0.0
             max_score = 0.0
 
+            # Index answers once instead of scanning the list per question
+            answers_by_id = {a['question_id']: a for a in answers}
+
+            # Grade every answered question in a single request
+            answered = [q for q in questions if q['id'] in answers_by_id]
+            grades_by_id = self._grade_answers_batch(answered, answers_by_id) if answered else {}
+
             for question in questions:
                 q_id = question['id']
-                answer = next((a for a in answers if a['question_id'] == q_id), None)
+                answer = answers_by_id.get(q_id)
 
                 if not answer:
                     results.append({
@@ -446,13 +639,9 @@ class GPTService(AIServiceInterface):
                     max_score += float(question['points'])
                     continue
 
-                grade_result = self.grade_answer(
-                    question['question'],
-                    answer['answer'],
-                )
+                grade = grades_by_id.get(q_id)
 
-                if grade_result['success']:
-                    grade = grade_result['grade']
+                if grade is not None:
                     score = (float(grade['score']) / 100.0) * float(question['points'])
                     results.append({
                         'question_id': q_id,
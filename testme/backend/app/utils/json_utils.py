@@ -0,0 +1,23 @@
+"""
+JSON utility functions
+"""
+
+
+def find_json_object(text):
+    """
+    Locate the outermost JSON object in model output
+    
+    Slices from the first '{' to the last '}', so surrounding prose and
+    markdown code fences are dropped without a regex scan.
+    
+    Args:
+        text: Raw model response text
+    
+    Returns:
+        str: Candidate JSON object text, or None if there are no braces
+    """
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end < start:
+        return None
+    return text[start:end + 1]
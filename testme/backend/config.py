@@ -1,9 +1,11 @@
 """
 FastAPI application configuration using Pydantic Settings
 """
-from typing import List, Set
+import os
+from functools import cached_property, lru_cache
+from typing import Set, Tuple
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import Field, computed_field
 
 
 class Settings(BaseSettings):
@@ -13,7 +15,9 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
-        extra="ignore"
+        extra="ignore",
+        frozen=True,
+        populate_by_name=True
     )
     
     # App Configuration
@@ -25,6 +29,8 @@ class Settings(BaseSettings):
     # Server
     host: str = Field(default="0.0.0.0", alias="HOST")
     port: int = Field(default=5000, alias="PORT")
+    # 2n+1 worker processes, one event loop each
+    workers: int = Field(default_factory=lambda: 2 * (os.cpu_count() or 1) + 1, alias="UVICORN_WORKERS")
     
     # File Upload
     max_file_size: int = Field(default=16777216, alias="MAX_FILE_SIZE")  # 16MB
@@ -53,14 +59,21 @@ class Settings(BaseSettings):
     # CORS
     cors_origins: str = Field(default="*", alias="CORS_ORIGINS")
     
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Parse CORS origins string into list"""
+    @computed_field
+    @cached_property
+    def cors_origins_list(self) -> Tuple[str, ...]:
+        """Parse CORS origins string into a tuple (parsed once, settings are frozen)"""
         if self.cors_origins == "*":
-            return ["*"]
-        return [origin.strip() for origin in self.cors_origins.split(",")]
+            return ("*",)
+        return tuple(origin.strip() for origin in self.cors_origins.split(","))
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Load settings from the environment once per process"""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
 
@@ -0,0 +1,11 @@
+"""
+Gunicorn configuration for production
+
+Run: gunicorn -c gunicorn.conf.py main:app
+"""
+from config import settings
+
+# One event loop per worker process; UvicornWorker picks uvloop/httptools when installed
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = settings.workers
+bind = f"{settings.host}:{settings.port}"
@@ -1,15 +1,27 @@
 """
 FastAPI application entry point
 """
-import firebase_admin
-from firebase_admin import credentials
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import Response
+from starlette.types import Scope
 from contextlib import asynccontextmanager
+import asyncio
+from functools import lru_cache
+from pathlib import Path
 import logging
+import sys
 
 from config import settings
+from app.routes import main as main_routes
+from app.routes import subject as subject_routes
+from app.routes import pdf as pdf_routes
+from app.routes import exam as exam_routes
+# from app.routes import admin as admin_routes
 
 
 # Configure logging
@@ -19,6 +31,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Static assets may be cached by browsers for a year without revalidation
+STATIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _init_firebase() -> None:
+    """
+    Initialize Firebase Admin SDK (blocking: reads credentials from disk)
+    """
+    # Imported here, off the module import path; this runs in a worker thread
+    import firebase_admin
+    from firebase_admin import credentials
+    
+    if firebase_admin._apps:
+        return
+    try:
+        cred = credentials.Certificate(settings.firebase_credentials_path)
+        firebase_admin.initialize_app(cred, {
+            'storageBucket': settings.firebase_storage_bucket
+        })
+        logger.info('Firebase Admin SDK initialized successfully')
+    except Exception as e:
+        logger.warning(f'Firebase initialization failed: {e}')
+        logger.warning('Some features may not work without Firebase credentials')
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -29,30 +65,68 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up test.me API...")
     
-    # Initialize Firebase Admin SDK
-    if not firebase_admin._apps:
-        try:
-            cred = credentials.Certificate(settings.firebase_credentials_path)
-            firebase_admin.initialize_app(cred, {
-                'storageBucket': settings.firebase_storage_bucket
-            })
-            logger.info('Firebase Admin SDK initialized successfully')
-        except Exception as e:
-            logger.warning(f'Firebase initialization failed: {e}')
-            logger.warning('Some features may not work without Firebase credentials')
+    # Initialize Firebase Admin SDK in the background; dependencies that
+    # need Firebase wait on app.state.firebase_ready
+    init_task = asyncio.create_task(asyncio.to_thread(_init_firebase))
+    app.state.firebase_ready = init_task
     
     logger.info("Application startup complete")
     
-    yield
+    try:
+        yield
+    finally:
+        await init_task
+        # Shutdown
+        logger.info("Shutting down test.me API...")
+
+
+async def unhandled_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    """
+    Turn any unhandled exception into a JSON 500 response
     
-    # Shutdown
-    logger.info("Shutting down test.me API...")
+    The traceback is still logged by the server; clients only get a
+    generic message.
+    """
+    return ORJSONResponse(
+        status_code=500,
+        content={"detail": "Internal server error"}
+    )
 
 
-def create_app() -> FastAPI:
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that answers misses from a manifest built at startup
+    
+    The directory is walked once; requests for paths not in it get a 404
+    without touching the disk. Files added after startup are not served
+    until restart. Served files carry STATIC_CACHE_CONTROL.
+    """
+    
+    def __init__(self, *, directory: str, **kwargs) -> None:
+        super().__init__(directory=directory, **kwargs)
+        root = Path(directory)
+        self._manifest = frozenset(
+            str(p.relative_to(root)) for p in root.rglob('*') if p.is_file()
+        )
+    
+    async def get_response(self, path: str, scope: Scope):
+        if path not in self._manifest:
+            raise StarletteHTTPException(status_code=404)
+        return await super().get_response(path, scope)
+    
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = STATIC_CACHE_CONTROL
+        return response
+
+
+def create_app(*, testing: bool = False) -> FastAPI:
     """
     Create and configure FastAPI application
     
+    Args:
+        testing: Skip the static files mount (admin assets are not needed in tests)
+    
     Returns:
         FastAPI application instance
     """
@@ -61,9 +135,13 @@ def create_app() -> FastAPI:
         version="2.0.0",
         description="AI-powered exam generation and grading platform",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
         debug=settings.debug
     )
     
+    # Routes let unexpected errors propagate; one handler shapes the 500
+    app.add_exception_handler(Exception, unhandled_exception_handler)
+    
     # Configure CORS
     app.add_middleware(
         CORSMiddleware,
@@ -73,19 +151,17 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Compress larger responses (exam/subject JSON is highly repetitive)
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+    
     # Mount static files (for admin interface)
-    try:
-        app.mount("/static", StaticFiles(directory="app/static"), name="static")
-    except Exception as e:
-        logger.warning(f"Could not mount static files: {e}")
+    if not testing:
+        try:
+            app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
+        except Exception as e:
+            logger.warning(f"Could not mount static files: {e}")
     
     # Register routers
-    from app.routes import main as main_routes
-    from app.routes import subject as subject_routes
-    from app.routes import pdf as pdf_routes
-    from app.routes import exam as exam_routes
-    # from app.routes import admin as admin_routes
-    
     app.include_router(main_routes.router)
     app.include_router(subject_routes.router, prefix="/api/subjects")
     app.include_router(pdf_routes.router, prefix="/api")
@@ -95,18 +171,33 @@ def create_app() -> FastAPI:
     return app
 
 
+@lru_cache(maxsize=1)
+def get_app() -> FastAPI:
+    """
+    Get the process-wide application, wired on first call
+    
+    create_app() always builds a fresh instance; this is the one the
+    server runs.
+    """
+    return create_app()
+
+
 # Create application instance
-app = create_app()
+app = get_app()
 
 
 if __name__ == '__main__':
     import uvicorn
     
+    # uvloop (C event loop) and httptools (C HTTP parser); uvloop has no Windows build
     uvicorn.run(
         "main:app",
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
+        workers=None if settings.debug else settings.workers,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         log_level="info"
     )
 
@@ -1,46 +1,201 @@
 """
 Pytest fixtures and configuration
 """
+import copy
+import io
 import pytest
 from unittest.mock import Mock, AsyncMock
 from fastapi.testclient import TestClient
+from httpx import AsyncClient, ASGITransport
 from main import create_app
-from datetime import datetime
+from datetime import datetime, timezone
+from types import MappingProxyType
+from google.cloud.firestore_v1 import DocumentReference
 
+from tests.fakes.firestore import TEST_SUBJECT_ID, FakeFirestore, build_firestore, collection_of
 
-@pytest.fixture
+# Fixed timestamp for fixture data: deterministic and no clock reads
+_FIXED_NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-integration",
+        action="store_true",
+        default=False,
+        help="run tests marked integration (live external API calls)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip integration tests unless --run-integration is given"""
+    if config.getoption("--run-integration"):
+        return
+    skip_integration = pytest.mark.skip(reason="live API test; use --run-integration to run")
+    for item in items:
+        if "integration" in item.keywords:
+            item.add_marker(skip_integration)
+
+
+@pytest.fixture(scope="session")
 def app():
-    """Create FastAPI app for testing"""
-    return create_app()
+    """Create FastAPI app for testing (built once per test run, without static files)"""
+    return create_app(testing=True)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client(app):
-    """Create test client"""
-    return TestClient(app)
+    """Create test client (lifespan runs once for the whole session)"""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
-def mock_firebase_user():
-    """Mock Firebase user data"""
-    return {
+async def async_client(app):
+    """Async test client driving the app in-process, without TestClient's worker thread"""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def reset_dependency_overrides(app):
+    """Fail a test that leaves a dependency override on the shared app"""
+    before = dict(app.dependency_overrides)
+    yield
+    leaked = dict(app.dependency_overrides)
+    # Clear first so one leak does not cascade into the following tests
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(before)
+    assert leaked == before, "dependency_overrides leaked"
+
+
+@pytest.fixture(autouse=True)
+def reset_firebase_clients():
+    """Drop cached Firebase clients so each test's patches take effect"""
+    from app.dependencies.firebase import get_firestore_client, get_firebase_storage_service
+    
+    get_firestore_client.cache_clear()
+    get_firebase_storage_service.cache_clear()
+    yield
+    get_firestore_client.cache_clear()
+    get_firebase_storage_service.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_subject_list_cache():
+    """Start every test with an empty list_subjects cache"""
+    from app.routes.subject import _subject_list_cache, _subject_list_generation
+    
+    _subject_list_cache.clear()
+    _subject_list_generation.clear()
+    yield
+    _subject_list_cache.clear()
+    _subject_list_generation.clear()
+
+
+@pytest.fixture(scope="session")
+def _mock_firebase_user_template():
+    """Read-only Firebase user data, built once per session"""
+    return MappingProxyType({
         "uid": "test_user_123",
         "email": "test@example.com",
         "display_name": "Test User"
-    }
+    })
+
+
+@pytest.fixture
+def mock_firebase_user(_mock_firebase_user_template):
+    """Mock Firebase user data"""
+    return dict(_mock_firebase_user_template)
+
+
+@pytest.fixture(scope="session")
+def _mock_get_current_user(_mock_firebase_user_template):
+    """Auth dependency replacement, built once per session"""
+    async def mock_get_current_user():
+        return _mock_firebase_user_template
+    
+    return mock_get_current_user
 
 
 @pytest.fixture
-def auth_override(app, mock_firebase_user):
+def auth_override(app, _mock_get_current_user):
     """Override authentication dependency for testing"""
     from app.dependencies.auth import get_current_user
     
-    async def mock_get_current_user():
-        return mock_firebase_user
-    
-    app.dependency_overrides[get_current_user] = mock_get_current_user
+    # Installed per test: the *_without_auth tests need the real dependency
+    previous = app.dependency_overrides.get(get_current_user)
+    app.dependency_overrides[get_current_user] = _mock_get_current_user
     yield
-    app.dependency_overrides.clear()
+    # The app is shared by the whole session; undo only our own override
+    if previous is None:
+        app.dependency_overrides.pop(get_current_user, None)
+    else:
+        app.dependency_overrides[get_current_user] = previous
+
+
+@pytest.fixture
+def storage_override(app, mock_storage_service):
+    """Serve mock_storage_service through the storage dependency"""
+    from app.dependencies.firebase import get_storage_service
+    
+    app.dependency_overrides[get_storage_service] = lambda: mock_storage_service
+    yield mock_storage_service
+    app.dependency_overrides.pop(get_storage_service, None)
+
+
+@pytest.fixture
+def ai_service_override(app, mock_ai_service):
+    """Serve mock_ai_service through the AI service dependency"""
+    from app.dependencies.ai_service import get_ai_service_dependency
+    
+    app.dependency_overrides[get_ai_service_dependency] = lambda: mock_ai_service
+    yield mock_ai_service
+    app.dependency_overrides.pop(get_ai_service_dependency, None)
+
+
+@pytest.fixture(scope="session")
+def _firestore_mock_template():
+    """users/{uid}/subjects/{id} Firestore mock chain, built once per session"""
+    subject_ref = Mock(spec=DocumentReference)
+    subjects = collection_of(subject_ref)
+    return build_firestore({'subjects': subjects}), subjects, subject_ref
+
+
+@pytest.fixture
+def firestore_mock(monkeypatch, _patch_firestore, _firestore_mock_template):
+    """
+    (db, subjects collection, subject reference) Firestore mocks
+    
+    The session-built chain with the previous test's configuration and
+    call history cleared; subjects.document() returns the subject reference.
+    Served as firestore.client() in place of the fake for the test.
+    """
+    import firebase_admin.firestore
+    
+    db, subjects, subject_ref = _firestore_mock_template
+    monkeypatch.setattr(firebase_admin.firestore, 'client', lambda: db)
+    db.reset_mock()
+    subjects.reset_mock(return_value=True, side_effect=True)
+    subject_ref.reset_mock(return_value=True, side_effect=True)
+    subjects.document.return_value = subject_ref
+    subject_ref.id = TEST_SUBJECT_ID
+    return db, subjects, subject_ref
+
+
+@pytest.fixture(scope="session")
+def fake_firestore():
+    """In-memory Firestore, one per session/xdist worker (emptied before every test)"""
+    return FakeFirestore()
+
+
+@pytest.fixture(autouse=True)
+def _patch_firestore(monkeypatch, fake_firestore):
+    """Serve the fake Firestore unless a test patches firestore.client itself"""
+    import firebase_admin.firestore
+    
+    fake_firestore.clear()
+    monkeypatch.setattr(firebase_admin.firestore, 'client', lambda: fake_firestore)
 
 
 @pytest.fixture
@@ -49,25 +204,47 @@ def mock_firestore_client():
     return Mock()
 
 
-@pytest.fixture
-def mock_pdf_data():
-    """Mock PDF data"""
-    return {
+@pytest.fixture(scope="session")
+def mock_subject_data():
+    """Read-only subject data, built once per session (copy with dict() to mutate)"""
+    return MappingProxyType({
+        'subject_id': TEST_SUBJECT_ID,
+        'user_id': 'test_user_123',
+        'name': '데이터베이스',
+        'description': '데이터베이스 설계 및 구현',
+        'semester': '2025-1',
+        'year': 2025,
+        'color': '#FF5733',
+        'created_at': _FIXED_NOW,
+        'updated_at': None
+    })
+
+
+@pytest.fixture(scope="session")
+def _mock_pdf_data_template():
+    """Read-only PDF data, built once per session"""
+    return MappingProxyType({
         'file_id': 'test_pdf_123',
         'original_filename': 'test.pdf',
         'unique_filename': 'test_pdf_123.pdf',
         'storage_path': 'pdfs/test_user_123/test_pdf_123.pdf',
         'size': 1024,
         'user_id': 'test_user_123',
-        'uploaded_at': datetime.utcnow(),
+        'uploaded_at': _FIXED_NOW,
         'status': 'uploaded'
-    }
+    })
 
 
 @pytest.fixture
-def mock_exam_data():
-    """Mock exam data"""
-    return {
+def mock_pdf_data(_mock_pdf_data_template):
+    """Mock PDF data (a fresh copy; tests may mutate it)"""
+    return dict(_mock_pdf_data_template)
+
+
+@pytest.fixture(scope="session")
+def _mock_exam_data_template():
+    """Read-only exam data, built once per session"""
+    return MappingProxyType({
         'exam_id': 'test_exam_123',
         'pdf_id': 'test_pdf_123',
         'user_id': 'test_user_123',
@@ -91,57 +268,90 @@ def mock_exam_data():
         'estimated_time': 15,
         'num_questions': 2,
         'difficulty': 'medium',
-        'created_at': datetime.utcnow(),
+        'created_at': _FIXED_NOW,
         'status': 'active',
         'ai_provider': 'gpt'
-    }
+    })
 
 
 @pytest.fixture
-def mock_storage_service():
-    """Mock Firebase Storage Service"""
-    mock = Mock()
-    mock.upload_file = Mock(return_value={
-        'file_id': 'test_pdf_123',
-        'unique_filename': 'test_pdf_123.pdf',
-        'storage_path': 'pdfs/test_user_123/test_pdf_123.pdf',
-        'original_filename': 'test.pdf'
+def mock_exam_data(_mock_exam_data_template):
+    """Mock exam data (a deep copy; tests may mutate it and its questions)"""
+    return copy.deepcopy(dict(_mock_exam_data_template))
+
+
+def _configure_storage_service(mock: Mock) -> Mock:
+    """Apply the storage mock's default return values and side effects"""
+    mock.configure_mock(**{
+        'upload_file.return_value': {
+            'file_id': 'test_pdf_123',
+            'unique_filename': 'test_pdf_123.pdf',
+            'storage_path': 'pdfs/test_user_123/test_pdf_123.pdf',
+            'original_filename': 'test.pdf'
+        },
+        'get_file_size.return_value': 1024,
+        'get_download_url.return_value': 'https://mock-download-url.com/test.pdf',
+        'delete_file.return_value': True,
+        'download_file.return_value': b'%PDF-1.4 mock content',
+        'open_file.side_effect': lambda path: io.BytesIO(b'%PDF-1.4 mock content'),
     })
-    mock.get_file_size = Mock(return_value=1024)
-    mock.get_download_url = Mock(return_value='https://mock-download-url.com/test.pdf')
-    mock.delete_file = Mock(return_value=True)
-    mock.download_file = Mock(return_value=b'%PDF-1.4 mock content')
     return mock
 
 
+@pytest.fixture(scope="session")
+def _mock_storage_service():
+    """Firebase Storage Service mock tree, built once per session"""
+    return _configure_storage_service(Mock())
+
+
 @pytest.fixture
-def mock_ai_service():
-    """Mock AI Service"""
-    mock = Mock()
-    mock.provider_name = 'gpt'
-    mock.generate_exam_from_pdf = Mock(return_value={
-        'success': True,
-        'exam': {
-            'questions': [
-                {
-                    'id': 1,
-                    'question': 'What is 2+2?',
-                    'type': 'multiple_choice',
-                    'options': ['2', '3', '4', '5'],
-                    'points': 10
-                }
-            ],
-            'total_points': 10,
-            'estimated_time': 5
-        }
-    })
-    mock.grade_exam_with_pdf = Mock(return_value={
-        'success': True,
-        'result': {
-            'total_score': 85.0,
-            'max_score': 100.0,
-            'percentage': 85.0,
-            'question_results': []
-        }
+def mock_storage_service(_mock_storage_service):
+    """Mock Firebase Storage Service (calls and per-test overrides reset)"""
+    _mock_storage_service.reset_mock(return_value=True, side_effect=True)
+    return _configure_storage_service(_mock_storage_service)
+
+
+def _configure_ai_service(mock: Mock) -> Mock:
+    """Apply the AI service mock's default provider and return values"""
+    mock.configure_mock(**{
+        'provider_name': 'gpt',
+        'generate_exam_from_pdf.return_value': {
+            'success': True,
+            'exam': {
+                'questions': [
+                    {
+                        'id': 1,
+                        'question': 'What is 2+2?',
+                        'type': 'multiple_choice',
+                        'options': ['2', '3', '4', '5'],
+                        'points': 10
+                    }
+                ],
+                'total_points': 10,
+                'estimated_time': 5
+            }
+        },
+        'grade_exam_with_pdf.return_value': {
+            'success': True,
+            'result': {
+                'total_score': 85.0,
+                'max_score': 100.0,
+                'percentage': 85.0,
+                'question_results': []
+            }
+        },
     })
     return mock
+
+
+@pytest.fixture(scope="session")
+def _mock_ai_service():
+    """AI Service mock tree, built once per session"""
+    return _configure_ai_service(Mock())
+
+
+@pytest.fixture
+def mock_ai_service(_mock_ai_service):
+    """Mock AI Service (calls and per-test overrides reset)"""
+    _mock_ai_service.reset_mock(return_value=True, side_effect=True)
+    return _configure_ai_service(_mock_ai_service)
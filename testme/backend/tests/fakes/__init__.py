@@ -0,0 +1,3 @@
+"""
+In-memory test doubles for external services
+"""
@@ -0,0 +1,271 @@
+"""
+In-memory Firestore fake for route tests
+
+Covers the part of the google-cloud-firestore client API the routes use:
+collection/document references, get/set/update/delete, get_all, select,
+order_by, limit, stream, list_documents and write batches. Documents are
+stored by path; SERVER_TIMESTAMP resolves to the write time.
+
+Also holds the Mock-based helpers (FakeDoc, document_of, collection_of,
+build_firestore) for tests that assert on individual client calls.
+"""
+import copy
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from unittest.mock import Mock
+
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore_v1 import CollectionReference, DocumentReference
+
+DocPath = Tuple[str, ...]
+
+
+def _split(path: str) -> DocPath:
+    return tuple(part for part in path.split('/') if part)
+
+
+def _resolve_transforms(data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Copy data, replacing SERVER_TIMESTAMP sentinels with the write time"""
+    return {
+        key: now if value is firestore.SERVER_TIMESTAMP else copy.deepcopy(value)
+        for key, value in data.items()
+    }
+
+
+class FakeSnapshot:
+    """Document snapshot; to_dict() honors a field projection"""
+    
+    def __init__(self, reference: 'FakeDocumentReference', data: Optional[Dict[str, Any]],
+                 field_paths: Optional[Iterable[str]] = None) -> None:
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        if data is not None and field_paths is not None:
+            data = {key: value for key, value in data.items() if key in set(field_paths)}
+        self._data = data
+    
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+    
+    def get(self, field: str) -> Any:
+        return self._data[field]
+
+
+class FakeDocumentReference:
+    """Reference to a document path in a FakeFirestore"""
+    
+    def __init__(self, db: 'FakeFirestore', path: DocPath) -> None:
+        self._db = db
+        self._path = path
+    
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+    
+    @property
+    def path(self) -> str:
+        return '/'.join(self._path)
+    
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FakeDocumentReference) and other._path == self._path
+    
+    def __hash__(self) -> int:
+        return hash(self._path)
+    
+    def collection(self, name: str) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._db, self._path + (name,))
+    
+    def get(self, field_paths: Optional[Iterable[str]] = None) -> FakeSnapshot:
+        return FakeSnapshot(self, self._db._store.get(self._path), field_paths)
+    
+    def set(self, data: Dict[str, Any], merge: bool = False) -> SimpleNamespace:
+        now = datetime.now(timezone.utc)
+        resolved = _resolve_transforms(data, now)
+        if merge and self._path in self._db._store:
+            resolved = {**self._db._store[self._path], **resolved}
+        self._db._store[self._path] = resolved
+        return SimpleNamespace(update_time=now)
+    
+    def update(self, data: Dict[str, Any]) -> SimpleNamespace:
+        if self._path not in self._db._store:
+            raise NotFound(f'No document to update: {self.path}')
+        now = datetime.now(timezone.utc)
+        self._db._store[self._path].update(_resolve_transforms(data, now))
+        return SimpleNamespace(update_time=now)
+    
+    def delete(self) -> SimpleNamespace:
+        self._db._store.pop(self._path, None)
+        return SimpleNamespace(update_time=datetime.now(timezone.utc))
+
+
+class FakeQuery:
+    """Query over the direct children of a collection"""
+    
+    def __init__(self, db: 'FakeFirestore', path: DocPath, fields: Optional[List[str]] = None,
+                 orders: Tuple[Tuple[str, str], ...] = (), limit: Optional[int] = None) -> None:
+        self._db = db
+        self._path = path
+        self._fields = fields
+        self._orders = orders
+        self._limit = limit
+    
+    def _copy(self, **changes: Any) -> 'FakeQuery':
+        params = dict(fields=self._fields, orders=self._orders, limit=self._limit)
+        params.update(changes)
+        return FakeQuery(self._db, self._path, **params)
+    
+    def select(self, field_paths: Iterable[str]) -> 'FakeQuery':
+        return self._copy(fields=list(field_paths))
+    
+    def order_by(self, field_path: str, direction: str = firestore.Query.ASCENDING) -> 'FakeQuery':
+        return self._copy(orders=self._orders + ((field_path, direction),))
+    
+    def limit(self, count: int) -> 'FakeQuery':
+        return self._copy(limit=count)
+    
+    def stream(self) -> Iterator[FakeSnapshot]:
+        depth = len(self._path) + 1
+        rows = [
+            (path, data) for path, data in self._db._store.items()
+            if len(path) == depth and path[:-1] == self._path
+        ]
+        # Like Firestore, ordering drops documents that lack the field
+        for field, direction in reversed(self._orders):
+            rows = [row for row in rows if field in row[1]]
+            rows.sort(key=lambda row: row[1][field], reverse=direction == firestore.Query.DESCENDING)
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        for path, data in rows:
+            yield FakeSnapshot(FakeDocumentReference(self._db, path), data, self._fields)
+    
+    def get(self) -> List[FakeSnapshot]:
+        return list(self.stream())
+
+
+class FakeCollectionReference(FakeQuery):
+    """Reference to a collection path in a FakeFirestore"""
+    
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+    
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._db, self._path + (document_id or uuid.uuid4().hex[:20],))
+    
+    def list_documents(self, page_size: Optional[int] = None) -> Iterator[FakeDocumentReference]:
+        # Includes "missing" documents that only exist as parents of subcollections
+        depth = len(self._path) + 1
+        ids = dict.fromkeys(
+            path[depth - 1] for path in self._db._store
+            if len(path) >= depth and path[:depth - 1] == self._path
+        )
+        for document_id in ids:
+            yield self.document(document_id)
+
+
+class FakeWriteBatch:
+    """Write batch applied on commit"""
+    
+    def __init__(self) -> None:
+        self._writes = []
+    
+    def set(self, reference: FakeDocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append(lambda: reference.set(data, merge=merge))
+    
+    def update(self, reference: FakeDocumentReference, data: Dict[str, Any]) -> None:
+        self._writes.append(lambda: reference.update(data))
+    
+    def delete(self, reference: FakeDocumentReference) -> None:
+        self._writes.append(reference.delete)
+    
+    def commit(self) -> List[SimpleNamespace]:
+        writes, self._writes = self._writes, []
+        return [write() for write in writes]
+
+
+class FakeFirestore:
+    """In-memory stand-in for firestore.Client"""
+    
+    def __init__(self) -> None:
+        self._store: Dict[DocPath, Dict[str, Any]] = {}
+    
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, _split(name))
+    
+    def document(self, path: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self, _split(path))
+    
+    def get_all(self, references: Iterable[FakeDocumentReference],
+                field_paths: Optional[Iterable[str]] = None) -> Iterator[FakeSnapshot]:
+        for reference in references:
+            yield reference.get(field_paths=field_paths)
+    
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch()
+    
+    # ---------- test helpers ----------
+    def seed(self, path: str, data: Mapping[str, Any]) -> None:
+        """Store a document at a slash-separated path"""
+        self._store[_split(path)] = copy.deepcopy(dict(data))
+    
+    def data(self, path: str) -> Optional[Dict[str, Any]]:
+        """Stored document at a slash-separated path, or None"""
+        return copy.deepcopy(self._store.get(_split(path)))
+    
+    def clear(self) -> None:
+        self._store.clear()
+
+
+# ---------- Mock-based helpers ----------
+
+# Subject the route tests file their PDFs and exams under
+TEST_SUBJECT_ID = "test_subject_123"
+
+
+class FakeDoc:
+    """
+    Firestore document snapshot stand-in
+    
+    A plain slotted object: route tests only read exists, id and to_dict(),
+    so a Mock (and its child-mock machinery) is not needed.
+    """
+    __slots__ = ('exists', 'id', '_data')
+    
+    def __init__(self, data: Optional[Mapping[str, Any]] = None, exists: bool = True, id: Optional[str] = None) -> None:
+        self.exists = exists
+        self.id = id
+        self._data = data
+    
+    def to_dict(self) -> Optional[Mapping[str, Any]]:
+        return self._data
+
+
+def document_of(snapshot: FakeDoc) -> Mock:
+    """DocumentReference mock whose get() returns the given snapshot"""
+    ref = Mock(spec=DocumentReference)
+    ref.get.return_value = snapshot
+    return ref
+
+
+def collection_of(document: Mock) -> Mock:
+    """CollectionReference mock whose document() returns the given reference"""
+    collection = Mock(spec=CollectionReference)
+    collection.document.return_value = document
+    return collection
+
+
+def build_firestore(user_collections: Dict[str, Mock]) -> Mock:
+    """
+    Firestore client mock rooted at users/{uid}
+    
+    db.collection('users').document(uid).collection(name) returns
+    user_collections[name]; an unexpected name raises KeyError.
+    """
+    db = Mock(spec=firestore.Client)
+    user_doc = Mock(spec=DocumentReference)
+    user_doc.collection.side_effect = user_collections.__getitem__
+    db.collection.return_value.document.return_value = user_doc
+    return db
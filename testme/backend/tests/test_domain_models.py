@@ -3,7 +3,8 @@ Domain model validation tests - Pure business logic without infrastructure
 """
 import pytest
 from datetime import datetime
-from pydantic import ValidationError
+from typing import List
+from pydantic import TypeAdapter, ValidationError
 from app.models.domain import Subject, PDF, Question, Exam, QuestionResult, GradingResult
 from app.models.requests import (
     SubjectCreateRequest,
@@ -14,6 +15,12 @@ from app.models.requests import (
 )
 from app.models.responses import SubjectResponse, SubjectListResponse
 
+# Validates a whole list of question payloads in one pydantic-core call
+_QUESTIONS_ADAPTER = TypeAdapter(List[Question])
+
+# Timestamps are plain test data; a fixed value keeps the models deterministic
+_FIXED_NOW = datetime(2025, 1, 1)
+
 
 class TestSubjectModel:
     """Test Subject domain model"""
@@ -28,7 +35,7 @@ class TestSubjectModel:
             semester="2025-1",
             year=2025,
             color="#FF5733",
-            created_at=datetime.utcnow()
+            created_at=_FIXED_NOW
         )
         
         assert subject.subject_id == "subj_123"
@@ -42,7 +49,7 @@ class TestSubjectModel:
             subject_id="subj_123",
             user_id="user_123",
             name="알고리즘",
-            created_at=datetime.utcnow()
+            created_at=_FIXED_NOW
         )
         
         assert subject.name == "알고리즘"
@@ -75,8 +82,8 @@ class TestSubjectRequestModels:
                 description="설명만 있음"
             )
         
-        errors = exc_info.value.errors()
-        assert any(error['loc'] == ('name',) for error in errors)
+        errors = {error['loc']: error for error in exc_info.value.errors()}
+        assert errors[('name',)]['type'] == 'missing'
     
     def test_create_request_invalid_color_format(self):
         """Test invalid color format"""
@@ -86,17 +93,21 @@ class TestSubjectRequestModels:
                 color="invalid_color"
             )
         
-        errors = exc_info.value.errors()
-        assert any('color' in str(error) for error in errors)
+        errors = {error['loc']: error for error in exc_info.value.errors()}
+        assert errors[('color',)]['type'] == 'string_pattern_mismatch'
     
-    def test_create_request_valid_color_formats(self):
+    @pytest.mark.parametrize("color", ["#FF5733", "#abc123", "#000000", "#FFFFFF"])
+    def test_create_request_valid_color_formats(self, color):
         """Test various valid color formats"""
-        valid_colors = ["#FF5733", "#abc123", "#000000", "#FFFFFF"]
-        
-        for color in valid_colors:
-            request = SubjectCreateRequest(name="과목", color=color)
-            assert request.color == color
-    
+        request = SubjectCreateRequest.model_validate({"name": "과목", "color": color})
+        assert request.color == color
+
+    def test_create_request_rejects_non_hex_digit_colors(self):
+        """Test colors other than '#' followed by exactly six hex digits are rejected"""
+        for color in ["#+12345", "#12_345", "# 12345", "#FF573", "FF5733"]:
+            with pytest.raises(ValidationError):
+                SubjectCreateRequest(name="과목", color=color)
+
     def test_create_request_year_range_validation(self):
         """Test year range validation"""
         # Valid year
@@ -111,6 +122,13 @@ class TestSubjectRequestModels:
         with pytest.raises(ValidationError):
             SubjectCreateRequest(name="과목", year=2101)
     
+    def test_create_request_is_frozen(self):
+        """Test request models cannot be modified after validation"""
+        request = SubjectCreateRequest(name="과목")
+        
+        with pytest.raises(ValidationError):
+            request.name = "다른 과목"
+    
     def test_update_request_all_optional(self):
         """Test that all fields in update request are optional"""
         request = SubjectUpdateRequest()
@@ -142,7 +160,7 @@ class TestSubjectResponseModels:
             subject_id="subj_123",
             user_id="user_123",
             name="과목",
-            created_at=datetime.utcnow()
+            created_at=_FIXED_NOW
         )
         
         response = SubjectResponse(success=True, subject=subject)
@@ -157,7 +175,7 @@ class TestSubjectResponseModels:
                 subject_id=f"subj_{i}",
                 user_id="user_123",
                 name=f"과목 {i}",
-                created_at=datetime.utcnow()
+                created_at=_FIXED_NOW
             )
             for i in range(3)
         ]
@@ -186,7 +204,7 @@ class TestPDFModel:
             storage_path="pdfs/user_123/pdf_123_lecture.pdf",
             size=1024000,
             user_id="user_123",
-            uploaded_at=datetime.utcnow(),
+            uploaded_at=_FIXED_NOW,
             status="uploaded"
         )
         
@@ -229,22 +247,22 @@ class TestExamModels:
     
     def test_exam_creation(self):
         """Test creating an exam"""
-        questions = [
-            Question(
-                id=1,
-                question="질문 1",
-                type="multiple_choice",
-                options=["A", "B", "C", "D"],
-                points=10
-            ),
-            Question(
-                id=2,
-                question="질문 2",
-                type="essay",
-                options=None,
-                points=20
-            )
-        ]
+        questions = _QUESTIONS_ADAPTER.validate_python([
+            {
+                "id": 1,
+                "question": "질문 1",
+                "type": "multiple_choice",
+                "options": ["A", "B", "C", "D"],
+                "points": 10
+            },
+            {
+                "id": 2,
+                "question": "질문 2",
+                "type": "essay",
+                "options": None,
+                "points": 20
+            }
+        ])
         
         exam = Exam(
             exam_id="exam_123",
@@ -256,7 +274,7 @@ class TestExamModels:
             estimated_time=30,
             num_questions=2,
             difficulty="medium",
-            created_at=datetime.utcnow(),
+            created_at=_FIXED_NOW,
             ai_provider="gpt"
         )
         
@@ -292,6 +310,17 @@ class TestExamRequestModels:
                 difficulty="super_hard"  # Invalid
             )
     
+    def test_exam_generation_case_insensitive_enums(self):
+        """Test difficulty and ai_provider accept any casing"""
+        request = ExamGenerationRequest(
+            pdf_id="pdf_123",
+            difficulty="HARD",
+            ai_provider="Gemini"
+        )
+
+        assert request.difficulty == "hard"
+        assert request.ai_provider == "gemini"
+
     def test_exam_generation_invalid_num_questions(self):
         """Test invalid number of questions"""
         # Too few
@@ -419,12 +448,10 @@ class TestBusinessRules:
     
     def test_exam_points_consistency(self):
         """Test that exam total points match question points"""
-        questions = [
-            Question(id=1, question="Q1", type="multiple_choice", 
-                    options=["A"], points=10),
-            Question(id=2, question="Q2", type="essay", 
-                    options=None, points=20)
-        ]
+        questions = _QUESTIONS_ADAPTER.validate_python([
+            {"id": 1, "question": "Q1", "type": "multiple_choice", "options": ["A"], "points": 10},
+            {"id": 2, "question": "Q2", "type": "essay", "options": None, "points": 20}
+        ])
         
         # Correct total
         exam = Exam(
@@ -437,7 +464,7 @@ class TestBusinessRules:
             estimated_time=30,
             num_questions=2,
             difficulty="medium",
-            created_at=datetime.utcnow()
+            created_at=_FIXED_NOW
         )
         
         # Verify
@@ -1,14 +1,17 @@
 """
 Simple greeting test for GPT-5 with robust fallbacks.
+The gpt-5 parameter variants are raced concurrently; the first non-empty
+reply wins and the remaining requests are cancelled.
 Run:
   source venv/bin/activate && export $(grep -v '^#' .env | xargs) && OPENAI_MODEL=gpt-5 python tests/test_gpt5_greeting.py
 """
 import os
 import json
-from openai import OpenAI
+import asyncio
+from openai import AsyncOpenAI
 
 
-def call_gpt(client, model, messages, *, use_max_completion=True, include_temp=False):
+async def call_gpt(client, model, messages, *, use_max_completion=True, include_temp=False):
     kwargs = {
         'model': model,
         'messages': messages,
@@ -17,47 +20,59 @@ def call_gpt(client, model, messages, *, use_max_completion=True, include_temp=F
         kwargs['max_completion_tokens'] = 50
     if include_temp:
         kwargs['temperature'] = 1  # some gpt-5 variants only accept default
-    return client.chat.completions.create(**kwargs)
+    return await client.chat.completions.create(**kwargs)
 
 
-def main():
+async def first_non_empty(coros):
+    """Run requests concurrently; return (content, response) of the first non-empty reply."""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                resp = await next_done
+            except Exception as e:
+                print(f'[WARN] Variant failed: {e}')
+                continue
+            content = resp.choices[0].message.content or ''
+            if content.strip():
+                return content, resp
+        return None, None
+    finally:
+        # Cancel whatever is still in flight once we have an answer
+        for task in tasks:
+            task.cancel()
+
+
+async def main_async():
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key or api_key == 'your-openai-api-key-here':
         print('ERROR: OPENAI_API_KEY not set')
         return 1
 
     model = os.getenv('OPENAI_MODEL', 'gpt-5')
-    client = OpenAI(api_key=api_key)
+    client = AsyncOpenAI(api_key=api_key)
 
     messages = [
         {"role": "system", "content": "너는 한국어로만 아주 짧고 공손하게 응답하는 도우미야."},
         {"role": "user", "content": "안녕"}
     ]
 
-    # Try 1: gpt-5, max_completion_tokens only
-    resp = call_gpt(client, model, messages, use_max_completion=True, include_temp=False)
-    content = resp.choices[0].message.content or ''
-    if content.strip():
-        print(content)
-        return 0
-
-    # Try 2: gpt-5, no token param (let server decide)
-    resp = call_gpt(client, model, messages, use_max_completion=False, include_temp=False)
-    content = resp.choices[0].message.content or ''
-    if content.strip():
-        print(content)
-        return 0
-
-    # Try 3: gpt-5 with explicit default temperature
-    resp = call_gpt(client, model, messages, use_max_completion=True, include_temp=True)
-    content = resp.choices[0].message.content or ''
-    if content.strip():
+    # gpt-5 variants in parallel:
+    #   1. max_completion_tokens only
+    #   2. no token param (let server decide)
+    #   3. explicit default temperature
+    content, _ = await first_non_empty([
+        call_gpt(client, model, messages, use_max_completion=True, include_temp=False),
+        call_gpt(client, model, messages, use_max_completion=False, include_temp=False),
+        call_gpt(client, model, messages, use_max_completion=True, include_temp=True),
+    ])
+    if content:
         print(content)
         return 0
 
     # Fallback: gpt-4o-mini
     fallback_model = 'gpt-4o-mini'
-    resp = call_gpt(client, fallback_model, messages, use_max_completion=True, include_temp=False)
+    resp = await call_gpt(client, fallback_model, messages, use_max_completion=True, include_temp=False)
     content = resp.choices[0].message.content or ''
     if content.strip():
         print(content)
@@ -70,5 +85,9 @@ def main():
     return 0
 
 
+def main():
+    return asyncio.run(main_async())
+
+
 if __name__ == '__main__':
     raise SystemExit(main())
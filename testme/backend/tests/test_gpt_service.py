@@ -1,233 +1,364 @@
 """
-Test GPT Service
+Tests for GPTService
 
-Run with: python -m pytest tests/test_gpt_service.py -v
-Or: python tests/test_gpt_service.py (standalone)
+OpenAI HTTP is answered in-memory by an httpx.MockTransport, so these run
+offline and without an API key.
 """
-import os
-import sys
+import io
+import json
 
-# Add project root to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import httpx
+import pytest
+from cachetools import TTLCache
+from openai import OpenAI
 
+from app.services import gpt_service as gpt_module
 from app.services.gpt_service import GPTService
 
 
-def test_gpt_simple_call():
-    """Test basic GPT API call"""
-    print("\n=== Test 1: Simple GPT API Call ===")
-    
-    try:
-        # Check if API key exists
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key or api_key == 'your-openai-api-key-here':
-            print("⚠️  SKIPPED: OPENAI_API_KEY not set")
-            print("   Set your API key in .env file")
-            return False
-        
-        # Initialize service
-        gpt_service = GPTService(api_key=api_key)
-        print(f"✓ GPTService initialized with model: {gpt_service.model}")
-        
-        # Simple test call
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Use mini for testing (cheaper)
-            messages=[
-                {"role": "user", "content": "Say 'test successful' if you can read this."}
-            ],
-            max_tokens=50
-        )
-        
-        result = response.choices[0].message.content
-        print(f"✓ API Response: {result}")
-        print("✅ Test PASSED: Basic GPT API call works")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Test FAILED: {e}")
-        print(f"   Error type: {type(e).__name__}")
-        return False
-
-
-def test_gpt_json_response():
-    """Test GPT JSON response format"""
-    print("\n=== Test 2: JSON Response Format ===")
-    
-    try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key or api_key == 'your-openai-api-key-here':
-            print("⚠️  SKIPPED: OPENAI_API_KEY not set")
-            return False
-        
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You respond in JSON format only."},
-                {"role": "user", "content": 'Return JSON: {"status": "ok", "message": "test"}'}
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=100
-        )
-        
-        result = response.choices[0].message.content
-        print(f"✓ JSON Response: {result}")
-        
-        # Parse JSON
-        import json
-        data = json.loads(result)
-        print(f"✓ Parsed JSON: {data}")
-        print("✅ Test PASSED: JSON response format works")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Test FAILED: {e}")
-        print(f"   Error type: {type(e).__name__}")
-        return False
-
-
-def test_exam_generation_mock():
-    """Test exam generation with mock PDF text"""
-    print("\n=== Test 3: Exam Generation (Mock) ===")
-    
-    try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key or api_key == 'your-openai-api-key-here':
-            print("⚠️  SKIPPED: OPENAI_API_KEY not set")
-            return False
-        
-        gpt_service = GPTService(api_key=api_key)
-        
-        # Mock PDF text
-        mock_text = """
-        Python Programming Basics
-        
-        Variables and Data Types:
-        - Integer: whole numbers
-        - String: text data
-        - Float: decimal numbers
-        - Boolean: True or False
-        
-        Control Flow:
-        - if/else statements
-        - for loops
-        - while loops
-        """
-        
-        print("✓ Generating exam from mock PDF text...")
-        result = gpt_service.generate_exam_from_text(
-            mock_text,
-            num_questions=3,
-            difficulty="easy"
-        )
-        
-        if result['success']:
-            exam = result['exam']
-            print(f"✓ Generated {len(exam['questions'])} questions")
-            print(f"✓ Total points: {exam['total_points']}")
-            print(f"✓ Estimated time: {exam['estimated_time']} minutes")
-            
-            # Show first question
-            if exam['questions']:
-                q1 = exam['questions'][0]
-                print(f"\n  Sample Question:")
-                print(f"  Type: {q1.get('type')}")
-                print(f"  Question: {q1.get('question')[:100]}...")
-                print(f"  Points: {q1.get('points')}")
-            
-            print("✅ Test PASSED: Exam generation works")
-            return True
-        else:
-            print(f"❌ Test FAILED: {result.get('error')}")
-            return False
-        
-    except Exception as e:
-        print(f"❌ Test FAILED: {e}")
-        print(f"   Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
-        return False
-
-
-def test_grading_mock():
-    """Test answer grading with mock data"""
-    print("\n=== Test 4: Answer Grading (Mock) ===")
-    
-    try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key or api_key == 'your-openai-api-key-here':
-            print("⚠️  SKIPPED: OPENAI_API_KEY not set")
-            return False
-        
-        gpt_service = GPTService(api_key=api_key)
-        
-        # Mock question and answer
-        question = "What is a variable in Python?"
-        answer = "A variable is a container that stores data values."
-        
-        print("✓ Grading mock answer...")
-        result = gpt_service.grade_answer(question, answer)
-        
-        if result['success']:
-            grade = result['grade']
-            print(f"✓ Score: {grade['score']}/100")
-            print(f"✓ Correct: {grade['is_correct']}")
-            print(f"✓ Feedback: {grade['feedback'][:100]}...")
-            print("✅ Test PASSED: Answer grading works")
-            return True
-        else:
-            print(f"❌ Test FAILED: {result.get('error')}")
-            return False
-        
-    except Exception as e:
-        print(f"❌ Test FAILED: {e}")
-        print(f"   Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
-        return False
-
-
-def run_all_tests():
-    """Run all tests"""
-    print("\n" + "="*60)
-    print("GPT SERVICE TEST SUITE")
-    print("="*60)
-    
-    results = {
-        "Simple API Call": test_gpt_simple_call(),
-        "JSON Response": test_gpt_json_response(),
-        "Exam Generation": test_exam_generation_mock(),
-        "Answer Grading": test_grading_mock()
+def chat_completion(content: str, model: str = "gpt-4o-mini") -> dict:
+    """Minimal chat.completions response body carrying one message"""
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10},
     }
-    
-    print("\n" + "="*60)
-    print("TEST SUMMARY")
-    print("="*60)
-    
-    passed = sum(1 for v in results.values() if v)
-    total = len(results)
-    
-    for test_name, result in results.items():
-        status = "✅ PASS" if result else "❌ FAIL"
-        print(f"{status}: {test_name}")
-    
-    print(f"\nTotal: {passed}/{total} tests passed")
-    print("="*60 + "\n")
-    
-    return passed == total
-
-
-if __name__ == "__main__":
-    # Load environment variables
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    # Run tests
-    success = run_all_tests()
-    sys.exit(0 if success else 1)
 
+
+@pytest.fixture
+def openai_requests():
+    """Request bodies sent to /chat/completions, in order"""
+    return []
+
+
+@pytest.fixture
+def openai_responses():
+    """Queued (status, body) replies; the last one repeats once the queue runs dry"""
+    return [(200, chat_completion('{"status": "ok", "message": "test"}'))]
+
+
+@pytest.fixture
+def file_requests():
+    """Requests sent to the /files endpoints, in order"""
+    return []
+
+
+def assistants_api(request: httpx.Request, assistants: list, assistant_run: dict) -> httpx.Response:
+    """Answer the Assistants API calls _run_assistant_on_pdf makes"""
+    path = request.url.path
+    body = json.loads(request.content) if request.content else {}
+    if path.endswith("/assistants"):
+        if request.method == "GET":
+            return httpx.Response(200, json={"object": "list", "data": assistants, "has_more": False})
+        assistant = {"id": f"asst_{len(assistants) + 1}", "object": "assistant", "created_at": 0, **body}
+        assistants.append(assistant)
+        return httpx.Response(200, json=assistant)
+    if path.endswith("/threads"):
+        return httpx.Response(200, json={"id": "thread_1", "object": "thread", "created_at": 0, "metadata": {}})
+    if "/runs" in path:
+        return httpx.Response(200, json={
+            "id": "run_1",
+            "object": "thread.run",
+            "created_at": 0,
+            "thread_id": "thread_1",
+            "assistant_id": body.get("assistant_id"),
+            "status": assistant_run["status"],
+        })
+    assert path.endswith("/messages"), f"Unexpected OpenAI request: {request.method} {path}"
+    return httpx.Response(200, json={"object": "list", "has_more": False, "data": [{
+        "id": "msg_1",
+        "object": "thread.message",
+        "created_at": 0,
+        "thread_id": "thread_1",
+        "role": "assistant",
+        "content": [{"type": "text", "text": {"value": assistant_run["reply"], "annotations": []}}],
+    }]})
+
+
+@pytest.fixture
+def openai_assistants():
+    """Assistants that exist on the (fake) OpenAI account"""
+    return []
+
+
+@pytest.fixture
+def assistant_run():
+    """Status and reply of every assistant run"""
+    return {"status": "completed", "reply": '{"questions": [], "total_points": 0}'}
+
+
+@pytest.fixture
+def assistant_requests():
+    """(method, path, body) of Assistants API requests, in order"""
+    return []
+
+
+@pytest.fixture
+def gpt_service(
+    monkeypatch,
+    openai_requests,
+    openai_responses,
+    file_requests,
+    openai_assistants,
+    assistant_run,
+    assistant_requests
+):
+    """GPTService whose OpenAI client talks to an in-memory transport"""
+    # Start from a clean process-wide model memory, upload cache and assistant ids
+    monkeypatch.setattr(gpt_module, "_last_good_model", {})
+    monkeypatch.setattr(gpt_module, "_rejected_params", {})
+    monkeypatch.setattr(gpt_module, "_uploaded_files", TTLCache(maxsize=8, ttl=gpt_module.UPLOADED_FILE_CACHE_TTL))
+    monkeypatch.setattr(gpt_module, "_assistant_ids", {})
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if "/assistants" in path or "/threads" in path:
+            assistant_requests.append((request.method, path, json.loads(request.content) if request.content else {}))
+            return assistants_api(request, openai_assistants, assistant_run)
+        if "/files" in path:
+            file_requests.append(request)
+            if request.method == "DELETE":
+                return httpx.Response(200, json={"id": path.rsplit("/", 1)[-1], "object": "file", "deleted": True})
+            return httpx.Response(200, json={
+                "id": f"file-{len(file_requests)}",
+                "object": "file",
+                "bytes": 0,
+                "created_at": 0,
+                "filename": "lecture.pdf",
+                "purpose": "assistants",
+                "status": "processed",
+            })
+        assert path.endswith("/chat/completions"), f"Unexpected OpenAI request: {request.method} {path}"
+        openai_requests.append(json.loads(request.content))
+        status, body = openai_responses.pop(0) if len(openai_responses) > 1 else openai_responses[0]
+        return httpx.Response(status, json=body)
+
+    service = GPTService(api_key="test-key", model="gpt-4o-mini")
+    service.client = OpenAI(
+        api_key="test-key",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        max_retries=0,
+    )
+    yield service
+    service.client.close()
+
+
+def test_gpt_simple_call(gpt_service, openai_requests, openai_responses):
+    """Test basic chat completion through the service's client"""
+    openai_responses[:] = [(200, chat_completion("test successful"))]
+
+    response = gpt_service.client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": "Say 'test successful' if you can read this."}],
+        max_tokens=50
+    )
+
+    assert response.choices[0].message.content == "test successful"
+    assert openai_requests[0]["max_tokens"] == 50
+
+
+def test_gpt_json_response(gpt_service, openai_requests):
+    """Test JSON response format is requested and parsed"""
+    response = gpt_service._chat_with_fallback(
+        messages=[
+            {"role": "system", "content": "You respond in JSON format only."},
+            {"role": "user", "content": 'Return JSON: {"status": "ok", "message": "test"}'}
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=100
+    )
+
+    assert json.loads(response.choices[0].message.content) == {"status": "ok", "message": "test"}
+    assert openai_requests[0]["response_format"] == {"type": "json_object"}
+    assert gpt_service.active_model == "gpt-4o-mini"
+
+
+def test_max_tokens_rejection_is_retried_and_remembered(gpt_service, openai_requests, openai_responses):
+    """Test a model rejecting max_tokens is retried with max_completion_tokens, once per process"""
+    rejected = {"error": {"message": "Unsupported parameter: 'max_tokens'", "type": "invalid_request_error"}}
+    openai_responses[:] = [(400, rejected), (200, chat_completion("ok"))]
+
+    gpt_service._chat_with_fallback(messages=[{"role": "user", "content": "hi"}], max_tokens=10)
+    gpt_service._chat_with_fallback(messages=[{"role": "user", "content": "hi"}], max_tokens=10)
+
+    assert [("max_tokens" in body, body.get("max_completion_tokens")) for body in openai_requests] == [
+        (True, None),
+        (False, 10),
+        (False, 10),  # Second call skips the known-bad probe
+    ]
+
+
+def test_fallback_model_is_remembered_until_ttl(monkeypatch, gpt_service, openai_requests, openai_responses):
+    """Test a fallback that answered is tried first by later services, then the primary again after the TTL"""
+    overloaded = {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}
+    openai_responses[:] = [(429, overloaded), (200, chat_completion("ok"))]
+
+    gpt_service._chat_with_fallback(messages=[{"role": "user", "content": "hi"}])
+    assert [body["model"] for body in openai_requests] == ["gpt-4o-mini", "gpt-5"]
+
+    # The next request's service starts from the fallback
+    assert GPTService(api_key="test-key", model="gpt-4o-mini").active_model == "gpt-5"
+
+    # Once the TTL has passed, the primary goes first again
+    monkeypatch.setattr(gpt_module, "FALLBACK_MODEL_TTL", -1)
+    assert GPTService(api_key="test-key", model="gpt-4o-mini").active_model is None
+
+
+def test_grading(gpt_service, openai_responses):
+    """Test answer grading normalizes the model's JSON"""
+    openai_responses[:] = [(200, chat_completion(
+        '{"score": "87.6", "feedback": "Mostly right", "correct": "yes"}'
+    ))]
+
+    result = gpt_service.grade_answer(
+        "What is a variable in Python?",
+        "A variable is a container that stores data values."
+    )
+
+    assert result['success'] is True
+    assert result['grade']['score'] == 88
+    assert result['grade']['feedback'] == "Mostly right"
+    assert result['grade']['is_correct'] is True
+
+
+def test_upload_pdf_reused_and_left_to_expire(gpt_service, file_requests):
+    """Test the same PDF is uploaded once, with an OpenAI-side expiry"""
+    first = gpt_service._upload_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf")
+    second = gpt_service._upload_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf")
+
+    assert first == second
+    assert len(file_requests) == 1
+    body = file_requests[0].content
+    assert b'name="expires_after[anchor]"\r\n\r\ncreated_at' in body
+    assert f'name="expires_after[seconds]"\r\n\r\n{gpt_module.UPLOADED_FILE_EXPIRY}'.encode() in body
+
+
+def test_forgotten_pdf_is_uploaded_again_not_deleted(gpt_service, file_requests):
+    """Test a PDF dropped after a failed run is re-uploaded, and the shared file is not deleted"""
+    first = gpt_service._upload_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf")
+    gpt_service._forget_pdf(first)
+    second = gpt_service._upload_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf")
+
+    assert second != first
+    assert [request.method for request in file_requests] == ["POST", "POST"]
+
+
+def test_grade_exam_batches_answered_questions(gpt_service, openai_requests, openai_responses):
+    """Test answered questions are graded in one call, matched back by id"""
+    questions = [
+        {"id": 1, "question": "What is a variable?", "points": 10},
+        {"id": 2, "question": "What is a loop?", "points": 20},
+        {"id": 3, "question": "What is a function?", "points": 30},
+    ]
+    answers = [
+        {"question_id": 1, "answer": "A named value"},
+        {"question_id": 2, "answer": "Repeated code"},
+    ]
+    # Ids echoed back as strings; question 2 skipped by the model
+    openai_responses[:] = [(200, chat_completion(
+        '{"grades": [{"question_id": "1", "score": 50, "feedback": "Partly", "is_correct": false}]}'
+    ))]
+
+    result = gpt_service.grade_exam(questions, answers)
+
+    assert len(openai_requests) == 1
+    assert openai_requests[0]["max_tokens"] == 2 * gpt_module._GRADING_TOKENS_PER_QUESTION
+    assert "Question 3" not in openai_requests[0]["messages"][1]["content"]
+    assert result['success'] is True
+    assert [(r['question_id'], r['score'], r['feedback']) for r in result['result']['question_results']] == [
+        (1, 5.0, "Partly"),
+        (2, 0, "Grading error"),
+        (3, 0, "No answer provided"),
+    ]
+    assert result['result']['max_score'] == 60.0
+
+
+def test_grade_exam_failed_call_grades_answers_as_errors(gpt_service, openai_responses):
+    """Test a batch call that fails on every model marks each answered question as a grading error"""
+    openai_responses[:] = [(500, {"error": {"message": "Server error", "type": "server_error"}})]
+
+    result = gpt_service.grade_exam(
+        [{"id": 1, "question": "What is a variable?", "points": 10}],
+        [{"question_id": 1, "answer": "A named value"}],
+    )
+
+    assert result['success'] is True
+    assert result['result']['question_results'] == [
+        {'question_id': 1, 'score': 0, 'max_points': 10, 'feedback': 'Grading error'},
+    ]
+    assert result['result']['total_score'] == 0
+
+
+def test_generator_assistant_created_once_and_reused(gpt_service, assistant_requests):
+    """Test the exam generator assistant is created once per process and reused by later runs"""
+    for _ in range(2):
+        result = gpt_service.generate_exam_from_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf", num_questions=5)
+        assert result['success'] is True
+
+    created = [body for method, path, body in assistant_requests if method == "POST" and path.endswith("/assistants")]
+    runs = [body for method, path, body in assistant_requests if method == "POST" and path.endswith("/runs")]
+    assert len(created) == 1
+    assert created[0]["instructions"] == gpt_module._GENERATOR_INSTRUCTIONS
+    assert [run["assistant_id"] for run in runs] == ["asst_1", "asst_1"]
+    # Per-request settings ride on the run, not the shared assistant
+    assert "exactly 5 exam questions" in runs[0]["additional_instructions"]
+
+
+def test_existing_grader_assistant_is_adopted(gpt_service, openai_assistants, assistant_run, assistant_requests):
+    """Test a matching assistant left by an earlier process is adopted instead of created"""
+    openai_assistants.append({
+        "id": "asst_existing",
+        "object": "assistant",
+        "created_at": 0,
+        "name": "Exam Grader",
+        "model": gpt_service.model_candidates[0],
+        "instructions": gpt_module._GRADER_INSTRUCTIONS,
+        "tools": [{"type": "file_search"}],
+    })
+    assistant_run["reply"] = '{"question_results": [], "total_score": 0}'
+
+    result = gpt_service.grade_exam_with_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf", [], [])
+
+    assert result == {'success': True, 'result': {"question_results": [], "total_score": 0}}
+    assert not any(method == "POST" and path.endswith("/assistants") for method, path, _ in assistant_requests)
+    assert [body["assistant_id"] for method, path, body in assistant_requests if path.endswith("/runs")] == ["asst_existing"]
+
+
+def test_failed_run_uploads_pdf_again(gpt_service, assistant_run, file_requests):
+    """Test a failed assistant run stops the uploaded PDF from being reused"""
+    assistant_run["status"] = "failed"
+
+    result = gpt_service.generate_exam_from_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf")
+    assert result['success'] is False
+    gpt_service.generate_exam_from_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf")
+
+    assert [request.method for request in file_requests] == ["POST", "POST"]
+
+
+def test_pdf_grading_prompt_pairs_answers_by_question_id(gpt_service, assistant_run, assistant_requests):
+    """Test each question in the PDF grading prompt carries its own answer, whatever the answer order"""
+    assistant_run["reply"] = '{"question_results": []}'
+    questions = [
+        {"id": 1, "question": "What is a variable?", "points": 10},
+        {"id": 2, "question": "What is a loop?", "points": 20},
+        {"id": 3, "question": "What is a function?", "points": 30},
+    ]
+    answers = [
+        {"question_id": 3, "answer": "Reusable code"},
+        {"question_id": 1, "answer": "A named value"},
+    ]
+
+    gpt_service.grade_exam_with_pdf(io.BytesIO(b"%PDF-1.4 lecture"), "lecture.pdf", questions, answers)
+
+    thread = next(body for method, path, body in assistant_requests if path.endswith("/threads"))
+    prompt = thread["messages"][0]["content"]
+    assert "What is a variable?\nStudent's Answer: A named value\n" in prompt
+    assert "What is a loop?\nStudent's Answer: [No answer provided]\n" in prompt
+    assert "What is a function?\nStudent's Answer: Reusable code\n" in prompt
@@ -3,6 +3,7 @@ Tests for main API endpoints
 """
 import pytest
 from fastapi.testclient import TestClient
+from main import create_app, CachedStaticFiles
 
 
 def test_root_endpoint(client: TestClient):
@@ -31,3 +32,53 @@ def test_api_health_endpoint(client: TestClient):
     assert data["status"] == "healthy"
     assert data["message"] == "API is running"
 
+
+def test_unhandled_exception_returns_json_500():
+    """Test unexpected route errors are turned into a generic JSON 500"""
+    # Own app: the session-scoped one must not gain the /boom route
+    app = create_app()
+    app.debug = False  # debug mode serves Starlette's traceback page instead
+    
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("secret internals")
+    
+    client = TestClient(app, raise_server_exceptions=False)
+    response = client.get("/boom")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal server error"}
+
+
+def test_cached_static_files_serves_manifest_only(tmp_path):
+    """Test static files are served from the startup manifest"""
+    (tmp_path / "admin.css").write_text("body {}")
+    app = create_app()
+    app.mount("/assets", CachedStaticFiles(directory=str(tmp_path)), name="assets")
+    
+    # Created after the mount: not in the manifest
+    (tmp_path / "late.css").write_text("body {}")
+    
+    client = TestClient(app)
+    response = client.get("/assets/admin.css")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert client.get("/assets/late.css").status_code == 404
+    assert client.get("/assets/missing.css").status_code == 404
+
+
+def test_large_responses_are_gzipped():
+    """Test JSON responses above the size threshold are gzip-compressed"""
+    app = create_app()
+    
+    @app.get("/big")
+    async def big():
+        return {"questions": [{"id": i, "question": "What is normalization?"} for i in range(50)]}
+    
+    client = TestClient(app)
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["questions"]) == 50
+    
+    # Small responses are sent as-is
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
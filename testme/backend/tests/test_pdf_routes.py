@@ -3,75 +3,57 @@ Tests for PDF API routes - Subject-based structure
 """
 import pytest
 from unittest.mock import Mock, patch
-from fastapi.testclient import TestClient
+from httpx import AsyncClient
 from io import BytesIO
+from google.cloud.firestore_v1 import CollectionReference, DocumentReference
 
+from tests.fakes.firestore import TEST_SUBJECT_ID, FakeDoc, collection_of, document_of
 
-# Test subject ID to use across tests
-TEST_SUBJECT_ID = "test_subject_123"
 
+@pytest.fixture(scope="module")
+def pdf_bytes():
+    """Upload payload (wrap in a fresh BytesIO per request; uploads consume it)"""
+    return b'%PDF-1.4\n%Mock PDF content\n%%EOF'
 
-@pytest.fixture
-def mock_subject_data():
-    """Mock subject data"""
-    return {
-        'subject_id': TEST_SUBJECT_ID,
-        'user_id': 'test_user_123',
-        'name': '테스트 과목',
-        'description': None,
-        'semester': None,
-        'year': None,
-        'color': None,
-        'created_at': None,
-        'updated_at': None
-    }
 
+@pytest.fixture(scope="module")
+def invalid_bytes():
+    """Non-PDF upload payload"""
+    return b'text content'
 
-def test_upload_pdf_without_auth(client: TestClient):
+
+async def test_upload_pdf_without_auth(async_client: AsyncClient, pdf_bytes):
     """Test PDF upload without authentication fails"""
-    files = {'file': ('test.pdf', BytesIO(b'%PDF-1.4 content'), 'application/pdf')}
-    response = client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files=files)
+    files = {'file': ('test.pdf', BytesIO(pdf_bytes), 'application/pdf')}
+    response = await async_client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files=files)
     assert response.status_code == 401
 
 
-@patch('firebase_admin.firestore.client')
-@patch('app.routes.pdf.FirebaseStorageService')
-def test_upload_pdf_success(
-    mock_storage_class,
-    mock_firestore,
-    client: TestClient,
+async def test_upload_pdf_success(
+    async_client: AsyncClient,
+    firestore_mock,
     auth_override,
+    storage_override,
     mock_storage_service,
     mock_pdf_data,
-    mock_subject_data
+    mock_subject_data,
+    pdf_bytes
 ):
     """Test successful PDF upload"""
-    # Setup mocks
-    mock_storage_class.return_value = mock_storage_service
-    
     # Mock subject exists check
-    mock_subject_doc = Mock()
-    mock_subject_doc.exists = True
-    mock_subject_doc.to_dict.return_value = mock_subject_data
-    
-    mock_db = Mock()
+    mock_subject_doc = FakeDoc(mock_subject_data)
     
     # Mock subject reference
-    mock_subject_ref = Mock()
+    _, _, mock_subject_ref = firestore_mock
     mock_subject_ref.get.return_value = mock_subject_doc
     
     # Mock PDF reference
-    mock_pdf_ref = Mock()
-    mock_pdf_ref.set = Mock()
-    mock_subject_ref.collection.return_value.document.return_value = mock_pdf_ref
-    
-    mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_subject_ref
-    mock_firestore.return_value = mock_db
+    mock_pdf_ref = Mock(spec=DocumentReference)
+    mock_subject_ref.collection.return_value = collection_of(mock_pdf_ref)
     
     # Upload PDF
-    pdf_content = b'%PDF-1.4\n%Mock PDF content\n%%EOF'
-    files = {'file': ('test.pdf', BytesIO(pdf_content), 'application/pdf')}
-    response = client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files=files)
+    files = {'file': ('test.pdf', BytesIO(pdf_bytes), 'application/pdf')}
+    response = await async_client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files=files)
     
     assert response.status_code == 201
     data = response.json()
@@ -80,42 +62,63 @@ def test_upload_pdf_success(
     assert data['original_filename'] == 'test.pdf'
     assert 'file_url' in data
     assert TEST_SUBJECT_ID in data['file_url']
+    assert data['size'] == len(pdf_bytes)
+    mock_storage_service.get_file_size.assert_not_called()
 
 
-def test_upload_pdf_no_file(client: TestClient, auth_override):
-    """Test PDF upload without file fails"""
-    response = client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files={})
-    assert response.status_code == 422  # Validation error
-
-
-@patch('firebase_admin.firestore.client')
-def test_upload_pdf_invalid_extension(
-    mock_firestore,
-    client: TestClient,
+async def test_upload_pdf_too_large(
+    async_client: AsyncClient,
+    firestore_mock,
     auth_override,
-    mock_subject_data
+    storage_override,
+    mock_storage_service,
+    mock_subject_data,
+    pdf_bytes
 ):
-    """Test PDF upload with invalid file extension fails"""
-    # Mock subject exists
-    mock_subject_doc = Mock()
-    mock_subject_doc.exists = True
-    mock_subject_doc.to_dict.return_value = mock_subject_data
+    """Test PDF upload larger than max_file_size fails before reaching storage"""
+    from config import settings
     
-    mock_db = Mock()
-    mock_subject_ref = Mock()
+    mock_subject_doc = FakeDoc(mock_subject_data)
+    
+    _, _, mock_subject_ref = firestore_mock
     mock_subject_ref.get.return_value = mock_subject_doc
-    mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_subject_ref
-    mock_firestore.return_value = mock_db
     
-    files = {'file': ('test.txt', BytesIO(b'text content'), 'text/plain')}
-    response = client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files=files)
+    small_limit = settings.model_copy(update={'max_file_size': 8})
+    with patch('app.routes.pdf.settings', small_limit):
+        files = {'file': ('test.pdf', BytesIO(pdf_bytes), 'application/pdf')}
+        response = await async_client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files=files)
+    
     assert response.status_code == 400
+    mock_storage_service.upload_file.assert_not_called()
 
 
-@patch('firebase_admin.firestore.client')
-def test_list_pdfs(
-    mock_firestore,
-    client: TestClient,
+@pytest.mark.parametrize("upload, expected", [
+    (None, 422),  # No file part: request validation error
+    (('test.txt', 'text/plain'), 400),  # Not a PDF
+])
+async def test_upload_pdf_validation(
+    async_client: AsyncClient,
+    firestore_mock,
+    auth_override,
+    storage_override,
+    mock_subject_data,
+    invalid_bytes,
+    upload,
+    expected
+):
+    """Test PDF upload rejects a missing file or a non-PDF file"""
+    _, _, mock_subject_ref = firestore_mock
+    mock_subject_ref.get.return_value = FakeDoc(mock_subject_data)
+    
+    files = {} if upload is None else {'file': (upload[0], BytesIO(invalid_bytes), upload[1])}
+    response = await async_client.post(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/upload", files=files)
+    assert response.status_code == expected
+    storage_override.upload_file.assert_not_called()
+
+
+async def test_list_pdfs(
+    async_client: AsyncClient,
+    firestore_mock,
     auth_override,
     mock_pdf_data,
     mock_subject_data
@@ -125,66 +128,89 @@ def test_list_pdfs(
     mock_pdf_data['subject_id'] = TEST_SUBJECT_ID
     
     # Mock subject exists
-    mock_subject_doc = Mock()
-    mock_subject_doc.exists = True
-    mock_subject_doc.to_dict.return_value = mock_subject_data
+    mock_subject_doc = FakeDoc(mock_subject_data)
     
     # Mock PDF documents
-    mock_pdf_doc = Mock()
-    mock_pdf_doc.to_dict.return_value = mock_pdf_data
+    mock_pdf_doc = FakeDoc(mock_pdf_data)
     
-    mock_db = Mock()
-    mock_subject_ref = Mock()
+    _, _, mock_subject_ref = firestore_mock
     mock_subject_ref.get.return_value = mock_subject_doc
     
     # Mock PDFs collection
-    mock_pdfs_collection = Mock()
+    mock_pdfs_collection = Mock(spec=CollectionReference)
     mock_pdfs_collection.order_by.return_value.stream.return_value = [mock_pdf_doc]
     mock_subject_ref.collection.return_value = mock_pdfs_collection
     
-    mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_subject_ref
-    mock_firestore.return_value = mock_db
-    
     # List PDFs
-    response = client.get(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs")
+    response = await async_client.get(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs")
     
     assert response.status_code == 200
     data = response.json()
     assert data['success'] is True
-    assert 'pdfs' in data
-    assert data['count'] >= 0
+    assert data['count'] == 1
+    pdf = data['pdfs'][0]
+    assert pdf['file_id'] == 'test_pdf_123'
+    assert pdf['original_filename'] == 'test.pdf'
+    assert pdf['file_url'] == f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/test_pdf_123/download"
+    # A non-empty listing proves the subject exists; no extra read
+    mock_subject_ref.get.assert_not_called()
 
 
-@patch('firebase_admin.firestore.client')
-@patch('app.routes.pdf.FirebaseStorageService')
-def test_get_pdf_download_url(
-    mock_storage_class,
-    mock_firestore,
-    client: TestClient,
+async def test_list_pdfs_empty(
+    async_client: AsyncClient,
+    firestore_mock,
     auth_override,
+    mock_subject_data
+):
+    """Test listing PDFs of an existing subject with none uploaded"""
+    _, _, mock_subject_ref = firestore_mock
+    mock_subject_ref.get.return_value = FakeDoc(mock_subject_data)
+    mock_subject_ref.collection.return_value.order_by.return_value.stream.return_value = []
+    
+    response = await async_client.get(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs")
+    
+    assert response.status_code == 200
+    assert response.json() == {'success': True, 'pdfs': [], 'count': 0}
+    # Only an empty listing pays for the existence check
+    mock_subject_ref.get.assert_called_once_with(field_paths=[])
+
+
+async def test_list_pdfs_subject_not_found(
+    async_client: AsyncClient,
+    firestore_mock,
+    auth_override
+):
+    """Test listing PDFs of a missing subject fails"""
+    mock_subject_doc = FakeDoc(exists=False)
+    
+    _, _, mock_subject_ref = firestore_mock
+    mock_subject_ref.get.return_value = mock_subject_doc
+    mock_subject_ref.collection.return_value.order_by.return_value.stream.return_value = []
+    
+    response = await async_client.get(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs")
+    
+    assert response.status_code == 404
+
+
+async def test_get_pdf_download_url(
+    async_client: AsyncClient,
+    firestore_mock,
+    auth_override,
+    storage_override,
     mock_storage_service,
     mock_pdf_data
 ):
     """Test getting PDF download URL"""
-    # Setup mocks
-    mock_storage_class.return_value = mock_storage_service
-    
     mock_pdf_data['subject_id'] = TEST_SUBJECT_ID
     
-    mock_pdf_doc = Mock()
-    mock_pdf_doc.exists = True
-    mock_pdf_doc.to_dict.return_value = mock_pdf_data
+    mock_pdf_doc = FakeDoc(mock_pdf_data)
     
-    mock_db = Mock()
-    mock_subject_ref = Mock()
-    mock_pdf_ref = Mock()
-    mock_pdf_ref.get.return_value = mock_pdf_doc
-    mock_subject_ref.collection.return_value.document.return_value = mock_pdf_ref
-    mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_subject_ref
-    mock_firestore.return_value = mock_db
+    _, _, mock_subject_ref = firestore_mock
+    mock_pdf_ref = document_of(mock_pdf_doc)
+    mock_subject_ref.collection.return_value = collection_of(mock_pdf_ref)
     
     # Get download URL
-    response = client.get(
+    response = await async_client.get(
         f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/test_pdf_123/download",
         follow_redirects=False
     )
@@ -193,56 +219,38 @@ def test_get_pdf_download_url(
     assert 'location' in response.headers
 
 
-@patch('firebase_admin.firestore.client')
-@patch('app.routes.pdf.FirebaseStorageService')
-def test_delete_pdf(
-    mock_storage_class,
-    mock_firestore,
-    client: TestClient,
+async def test_delete_pdf(
+    async_client: AsyncClient,
+    firestore_mock,
     auth_override,
+    storage_override,
     mock_storage_service,
     mock_pdf_data
 ):
     """Test deleting PDF"""
-    # Setup mocks
-    mock_storage_class.return_value = mock_storage_service
-    
     mock_pdf_data['subject_id'] = TEST_SUBJECT_ID
     
-    mock_pdf_doc = Mock()
-    mock_pdf_doc.exists = True
-    mock_pdf_doc.to_dict.return_value = mock_pdf_data
+    mock_pdf_doc = FakeDoc(mock_pdf_data)
     
-    mock_db = Mock()
-    mock_subject_ref = Mock()
-    mock_pdf_ref = Mock()
-    mock_pdf_ref.get.return_value = mock_pdf_doc
-    mock_pdf_ref.delete = Mock()
-    mock_subject_ref.collection.return_value.document.return_value = mock_pdf_ref
-    mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_subject_ref
-    mock_firestore.return_value = mock_db
+    _, _, mock_subject_ref = firestore_mock
+    mock_pdf_ref = document_of(mock_pdf_doc)
+    mock_subject_ref.collection.return_value = collection_of(mock_pdf_ref)
     
     # Delete PDF
-    response = client.delete(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/test_pdf_123")
+    response = await async_client.delete(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/test_pdf_123")
     
     assert response.status_code == 200
     data = response.json()
     assert data['success'] is True
 
 
-def test_delete_pdf_not_found(client: TestClient, auth_override):
+async def test_delete_pdf_not_found(async_client: AsyncClient, firestore_mock, auth_override, storage_override):
     """Test deleting non-existent PDF fails"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        mock_pdf_doc = Mock()
-        mock_pdf_doc.exists = False
-        
-        mock_db = Mock()
-        mock_subject_ref = Mock()
-        mock_pdf_ref = Mock()
-        mock_pdf_ref.get.return_value = mock_pdf_doc
-        mock_subject_ref.collection.return_value.document.return_value = mock_pdf_ref
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_subject_ref
-        mock_firestore.return_value = mock_db
-        
-        response = client.delete(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/nonexistent_id")
-        assert response.status_code == 404
+    mock_pdf_doc = FakeDoc(exists=False)
+    
+    _, _, mock_subject_ref = firestore_mock
+    mock_pdf_ref = document_of(mock_pdf_doc)
+    mock_subject_ref.collection.return_value = collection_of(mock_pdf_ref)
+    
+    response = await async_client.delete(f"/api/subjects/{TEST_SUBJECT_ID}/pdfs/nonexistent_id")
+    assert response.status_code == 404
@@ -2,314 +2,312 @@
 Tests for Subject routes
 """
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock
 from datetime import datetime
-from firebase_admin import firestore
+from google.cloud.firestore_v1 import DocumentReference, Query
 
+from app.routes.subject import _invalidate_subject_list, _subject_list_generation
+from tests.fakes.firestore import FakeDoc
 
-@pytest.fixture
-def mock_subject_data():
-    """Mock subject data"""
-    return {
-        'subject_id': 'test_subject_123',
-        'user_id': 'test_user_123',
-        'name': '데이터베이스',
-        'description': '데이터베이스 설계 및 구현',
-        'semester': '2025-1',
-        'year': 2025,
-        'color': '#FF5733',
-        'created_at': datetime.utcnow(),
-        'updated_at': None
-    }
+# Request bodies, built once (only ever serialized, never mutated)
+CREATE_REQUEST = {
+    "name": "데이터베이스",
+    "description": "데이터베이스 설계 및 구현",
+    "semester": "2025-1",
+    "year": 2025,
+    "color": "#FF5733"
+}
+MISSING_NAME_REQUEST = {"description": "Test description"}
+INVALID_COLOR_REQUEST = {"name": "Test Subject", "color": "invalid_color"}
 
 
-def test_create_subject_success(client, auth_override, mock_subject_data):
+def test_create_subject_success(client, auth_override, firestore_mock, mock_subject_data):
     """Test successful subject creation"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_doc_ref = Mock()
-        mock_doc_ref.id = 'test_subject_123'
-        mock_doc_ref.get.return_value = Mock(to_dict=Mock(return_value=mock_subject_data))
-        
-        mock_collection = Mock()
-        mock_collection.document.return_value = mock_doc_ref
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value = mock_collection
-        
-        # Patch SERVER_TIMESTAMP
-        with patch('firebase_admin.firestore.SERVER_TIMESTAMP', datetime.utcnow()):
-            # Make request
-            response = client.post(
-                "/api/subjects",
-                json={
-                    "name": "데이터베이스",
-                    "description": "데이터베이스 설계 및 구현",
-                    "semester": "2025-1",
-                    "year": 2025,
-                    "color": "#FF5733"
-                }
-            )
-        
-        # Assertions
-        assert response.status_code == 201
-        data = response.json()
-        assert data['success'] is True
-        assert 'subject' in data
-        assert data['subject']['name'] == '데이터베이스'
+    # Setup mocks
+    _, _, mock_doc_ref = firestore_mock
+    mock_doc_ref.set.return_value.update_time = datetime(2025, 3, 1, 9, 30)
+    
+    # Make request
+    response = client.post("/api/subjects", json=CREATE_REQUEST)
+    
+    # Assertions
+    assert response.status_code == 201
+    data = response.json()
+    assert data['success'] is True
+    assert 'subject' in data
+    assert data['subject']['name'] == '데이터베이스'
+    assert data['subject']['subject_id'] == 'test_subject_123'
+    # created_at is the commit time reported by the write
+    assert data['subject']['created_at'] == '2025-03-01T09:30:00'
+    
+    # The response is built from the written data, not read back
+    mock_doc_ref.set.assert_called_once()
+    mock_doc_ref.get.assert_not_called()
 
 
 def test_create_subject_missing_name(client, auth_override):
     """Test subject creation without required name"""
-    response = client.post(
-        "/api/subjects",
-        json={
-            "description": "Test description"
-        }
-    )
+    response = client.post("/api/subjects", json=MISSING_NAME_REQUEST)
     
     assert response.status_code == 422  # Validation error
 
 
 def test_create_subject_invalid_color(client, auth_override):
     """Test subject creation with invalid color format"""
-    response = client.post(
-        "/api/subjects",
-        json={
-            "name": "Test Subject",
-            "color": "invalid_color"
-        }
-    )
+    response = client.post("/api/subjects", json=INVALID_COLOR_REQUEST)
     
     assert response.status_code == 422  # Validation error
 
 
-def test_list_subjects_success(client, auth_override, mock_subject_data):
+def test_list_subjects_success(client, auth_override, firestore_mock, mock_subject_data):
     """Test successful subject listing"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_doc = Mock()
-        mock_doc.to_dict.return_value = mock_subject_data
-        
-        mock_query = Mock()
-        mock_query.stream.return_value = [mock_doc]
-        
-        mock_collection = Mock()
-        mock_collection.order_by.return_value = mock_query
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value = mock_collection
-        
-        # Make request
-        response = client.get("/api/subjects")
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert data['success'] is True
-        assert 'subjects' in data
-        assert data['count'] == 1
-        assert data['subjects'][0]['name'] == '데이터베이스'
+    # Setup mocks
+    mock_doc = FakeDoc(mock_subject_data)
+    
+    mock_query = Mock(spec=Query)
+    mock_query.stream.return_value = [mock_doc]
+    
+    _, mock_collection, _ = firestore_mock
+    mock_collection.order_by.return_value = mock_query
+    
+    # Make request
+    response = client.get("/api/subjects")
+    
+    # Assertions
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] is True
+    assert 'subjects' in data
+    assert data['count'] == 1
+    assert data['subjects'][0]['name'] == '데이터베이스'
 
 
-def test_list_subjects_empty(client, auth_override):
-    """Test subject listing when no subjects exist"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_query = Mock()
-        mock_query.stream.return_value = []
-        
-        mock_collection = Mock()
-        mock_collection.order_by.return_value = mock_query
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value = mock_collection
-        
-        # Make request
-        response = client.get("/api/subjects")
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert data['success'] is True
-        assert data['count'] == 0
-        assert len(data['subjects']) == 0
+def test_list_subjects_cached_until_write(client, auth_override, firestore_mock, mock_subject_data):
+    """Test repeated listings are served from cache and writes invalidate it"""
+    # Setup mocks
+    mock_doc = FakeDoc(mock_subject_data)
+    
+    mock_query = Mock(spec=Query)
+    mock_query.stream.return_value = [mock_doc]
+    
+    _, mock_collection, mock_doc_ref = firestore_mock
+    mock_collection.order_by.return_value = mock_query
+    mock_doc_ref.id = 'new_subject_456'
+    mock_doc_ref.set.return_value.update_time = datetime(2025, 3, 1, 9, 30)
+    
+    # Two listings, one Firestore query
+    assert client.get("/api/subjects").status_code == 200
+    assert client.get("/api/subjects").status_code == 200
+    assert mock_query.stream.call_count == 1
+    
+    # Creating a subject drops the cached listing
+    assert client.post("/api/subjects", json={"name": "알고리즘"}).status_code == 201
+    assert client.get("/api/subjects").status_code == 200
+    assert mock_query.stream.call_count == 2
 
 
-def test_get_subject_success(client, auth_override, mock_subject_data):
-    """Test successful subject retrieval"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_doc = Mock()
-        mock_doc.exists = True
-        mock_doc.to_dict.return_value = mock_subject_data
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = mock_doc
-        
-        # Make request
-        response = client.get("/api/subjects/test_subject_123")
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert data['success'] is True
-        assert data['subject']['name'] == '데이터베이스'
+@pytest.mark.parametrize("generation_evicted", [False, True])
+def test_list_subjects_not_cached_when_write_races(
+    client, auth_override, firestore_mock, mock_subject_data, mock_firebase_user, generation_evicted
+):
+    """Test a listing that raced a write is not cached, even if the write's generation entry is gone"""
+    # Setup mocks
+    def stream_during_write(*args, **kwargs):
+        # A write in this process lands while the query is still running
+        _invalidate_subject_list(mock_firebase_user['uid'])
+        if generation_evicted:
+            _subject_list_generation.pop(mock_firebase_user['uid'])
+        yield FakeDoc(mock_subject_data)
+    
+    mock_query = Mock(spec=Query)
+    mock_query.stream.side_effect = stream_during_write
+    
+    _, mock_collection, _ = firestore_mock
+    mock_collection.order_by.return_value = mock_query
+    
+    # The possibly stale result is served once but not stored
+    assert client.get("/api/subjects").status_code == 200
+    assert client.get("/api/subjects").status_code == 200
+    assert mock_query.stream.call_count == 2
+
 
+def test_list_subjects_etag_not_modified(client, auth_override, firestore_mock, mock_subject_data):
+    """Test If-None-Match with the current ETag returns 304 without a body"""
+    # Setup mocks
+    mock_doc = FakeDoc(mock_subject_data)
+    
+    _, mock_collection, _ = firestore_mock
+    mock_collection.order_by.return_value.stream.return_value = [mock_doc]
+    
+    response = client.get("/api/subjects")
+    assert response.status_code == 200
+    etag = response.headers['etag']
+    assert etag.startswith('W/"')
+    
+    response = client.get("/api/subjects", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    
+    # Weak comparison: a client echoing the tag without W/ also matches
+    response = client.get("/api/subjects", headers={"If-None-Match": etag.removeprefix('W/')})
+    assert response.status_code == 304
+    
+    response = client.get("/api/subjects", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
 
-def test_get_subject_not_found(client, auth_override):
-    """Test subject retrieval when subject doesn't exist"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_doc = Mock()
-        mock_doc.exists = False
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = mock_doc
-        
-        # Make request
-        response = client.get("/api/subjects/nonexistent_id")
-        
-        # Assertions
-        assert response.status_code == 404
 
+def test_list_subjects_empty(client, auth_override, firestore_mock):
+    """Test subject listing when no subjects exist"""
+    # Setup mocks
+    mock_query = Mock(spec=Query)
+    mock_query.stream.return_value = []
+    
+    _, mock_collection, _ = firestore_mock
+    mock_collection.order_by.return_value = mock_query
+    
+    # Make request
+    response = client.get("/api/subjects")
+    
+    # Assertions
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] is True
+    assert data['count'] == 0
+    assert len(data['subjects']) == 0
 
-def test_update_subject_success(client, auth_override, mock_subject_data):
-    """Test successful subject update"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        updated_data = mock_subject_data.copy()
-        updated_data['name'] = '데이터베이스 시스템'
-        
-        mock_doc = Mock()
-        mock_doc.exists = True
-        mock_doc.to_dict.return_value = mock_subject_data
-        
-        mock_doc_ref = Mock()
-        mock_doc_ref.get.side_effect = [mock_doc, Mock(to_dict=Mock(return_value=updated_data))]
-        mock_doc_ref.update = Mock()
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_doc_ref
-        
-        # Patch SERVER_TIMESTAMP
-        with patch('firebase_admin.firestore.SERVER_TIMESTAMP', datetime.utcnow()):
-            # Make request
-            response = client.put(
-                "/api/subjects/test_subject_123",
-                json={"name": "데이터베이스 시스템"}
-            )
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert data['success'] is True
-        assert data['subject']['name'] == '데이터베이스 시스템'
 
+def test_get_subject_success(client, auth_override, firestore_mock, mock_subject_data):
+    """Test successful subject retrieval"""
+    # Setup mocks
+    mock_doc = FakeDoc(mock_subject_data)
+    
+    _, _, mock_doc_ref = firestore_mock
+    mock_doc_ref.get.return_value = mock_doc
+    
+    # Make request
+    response = client.get("/api/subjects/test_subject_123")
+    
+    # Assertions
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] is True
+    assert data['subject']['name'] == '데이터베이스'
 
-def test_update_subject_not_found(client, auth_override):
-    """Test subject update when subject doesn't exist"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_doc = Mock()
-        mock_doc.exists = False
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = mock_doc
-        
-        # Make request
-        response = client.put(
-            "/api/subjects/nonexistent_id",
-            json={"name": "Updated Name"}
-        )
-        
-        # Assertions
-        assert response.status_code == 404
 
+def test_get_subject_etag_not_modified(client, auth_override, firestore_mock, mock_subject_data):
+    """Test If-None-Match on a single subject returns 304, and an update changes the ETag"""
+    # Setup mocks
+    _, _, mock_doc_ref = firestore_mock
+    mock_doc_ref.get.return_value = FakeDoc(mock_subject_data)
+    
+    response = client.get("/api/subjects/test_subject_123")
+    assert response.status_code == 200
+    etag = response.headers['etag']
+    assert etag.startswith('W/"')
+    
+    response = client.get("/api/subjects/test_subject_123", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    
+    # Weak comparison: a client echoing the tag without W/ also matches
+    response = client.get("/api/subjects/test_subject_123", headers={"If-None-Match": etag.removeprefix('W/')})
+    assert response.status_code == 304
+    
+    # An update moves updated_at, so the old tag no longer matches
+    mock_doc_ref.get.return_value = FakeDoc({**mock_subject_data, 'updated_at': datetime(2025, 3, 1, 9, 30)})
+    response = client.get("/api/subjects/test_subject_123", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
 
-def test_delete_subject_success(client, auth_override, mock_subject_data):
-    """Test successful subject deletion"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_doc = Mock()
-        mock_doc.exists = True
-        mock_doc.to_dict.return_value = mock_subject_data
-        
-        mock_doc_ref = Mock()
-        mock_doc_ref.get.return_value = mock_doc
-        mock_doc_ref.delete = Mock()
-        
-        # Mock pdfs and exams collections
-        mock_doc_ref.collection.return_value.stream.return_value = []
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_doc_ref
-        
-        # Make request
-        response = client.delete("/api/subjects/test_subject_123")
-        
-        # Assertions
-        assert response.status_code == 200
-        data = response.json()
-        assert data['success'] is True
-        assert 'deleted successfully' in data['message']
 
+@pytest.mark.parametrize("method, payload", [
+    ("GET", None),
+    ("PUT", {"name": "Updated Name"}),
+    ("DELETE", None),
+])
+def test_subject_not_found(client, auth_override, firestore_mock, method, payload):
+    """Test subject routes when subject doesn't exist"""
+    # Setup mocks
+    _, _, mock_doc_ref = firestore_mock
+    mock_doc_ref.get.return_value = FakeDoc(exists=False)
+    
+    # Make request
+    response = client.request(method, "/api/subjects/nonexistent_id", json=payload)
+    
+    # Assertions
+    assert response.status_code == 404
 
-def test_delete_subject_not_found(client, auth_override):
-    """Test subject deletion when subject doesn't exist"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        mock_doc = Mock()
-        mock_doc.exists = False
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = mock_doc
-        
-        # Make request
-        response = client.delete("/api/subjects/nonexistent_id")
-        
-        # Assertions
-        assert response.status_code == 404
 
+def test_update_subject_success(client, auth_override, firestore_mock, mock_subject_data):
+    """Test successful subject update"""
+    # Setup mocks
+    mock_doc = FakeDoc(mock_subject_data)
+    
+    _, _, mock_doc_ref = firestore_mock
+    mock_doc_ref.get.return_value = mock_doc
+    mock_doc_ref.update.return_value.update_time = datetime(2025, 3, 1, 9, 30)
+    
+    # Make request
+    response = client.put(
+        "/api/subjects/test_subject_123",
+        json={"name": "데이터베이스 시스템"}
+    )
+    
+    # Assertions
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] is True
+    assert data['subject']['name'] == '데이터베이스 시스템'
+    assert data['subject']['updated_at'] == '2025-03-01T09:30:00'
+    
+    # Only the ownership read happens; the update is not read back
+    mock_doc_ref.get.assert_called_once()
+
+
+def test_delete_subject_success(client, auth_override, firestore_mock, mock_subject_data):
+    """Test successful subject deletion"""
+    # Setup mocks
+    mock_doc = FakeDoc(mock_subject_data)
+    
+    mock_db, _, mock_doc_ref = firestore_mock
+    mock_doc_ref.get.return_value = mock_doc
+    
+    # Mock pdfs and exams collections (one document each)
+    mock_child = Mock(spec=DocumentReference)
+    mock_doc_ref.collection.return_value.list_documents.side_effect = lambda **kwargs: iter([mock_child])
+    
+    mock_batch = mock_db.batch.return_value
+    
+    # Make request
+    response = client.delete("/api/subjects/test_subject_123")
+    
+    # Assertions
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] is True
+    assert 'deleted successfully' in data['message']
+    
+    # Each subcollection is purged with its own batch, then the subject is deleted
+    assert mock_batch.delete.call_count == 2
+    assert mock_batch.commit.call_count == 2
+    mock_doc_ref.delete.assert_called_once()
 
-def test_delete_subject_unauthorized(client, auth_override, mock_subject_data):
-    """Test subject deletion with wrong user"""
-    with patch('firebase_admin.firestore.client') as mock_firestore:
-        # Setup mocks
-        mock_db = Mock()
-        mock_firestore.return_value = mock_db
-        
-        # Different user_id
-        unauthorized_data = mock_subject_data.copy()
-        unauthorized_data['user_id'] = 'different_user'
-        
-        mock_doc = Mock()
-        mock_doc.exists = True
-        mock_doc.to_dict.return_value = unauthorized_data
-        
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = mock_doc
-        
-        # Make request
-        response = client.delete("/api/subjects/test_subject_123")
-        
-        # Assertions
-        assert response.status_code == 403
 
+def test_delete_subject_scoped_to_current_user(client, auth_override, firestore_mock, mock_firebase_user):
+    """Test subject deletion only looks under the authenticated user's path"""
+    # Setup mocks
+    # Another user's subject is simply not found under this user's path
+    mock_doc = FakeDoc(exists=False)
+    
+    mock_db, _, mock_doc_ref = firestore_mock
+    mock_doc_ref.get.return_value = mock_doc
+    
+    # Make request
+    response = client.delete("/api/subjects/test_subject_123")
+    
+    # Assertions
+    assert response.status_code == 404
+    mock_db.collection.assert_called_with('users')
+    mock_db.collection.return_value.document.assert_called_with(mock_firebase_user['uid'])